@@ -0,0 +1,93 @@
+import os
+import json
+
+import llm_cache
+
+
+def _pack(meta: dict, blob: bytes = b"") -> bytes:
+    # Compact JSON never contains a raw newline, so it can frame the blob
+    return json.dumps(meta, separators=(",", ":")).encode("utf-8") + b"\n" + blob
+
+
+def _unpack(value: bytes) -> tuple[dict, bytes]:
+    header, _, blob = value.partition(b"\n")
+    return json.loads(header), blob
+
+
+class ArtifactCache:
+    """
+    Content-addressed cache for the chart workflow, in two levels:
+
+      1) code:   (instruction, schema, model, output path) → generated code
+      2) render: (code, dataset fingerprint)               → PNG bytes + figure specs
+         reflect: (code, dataset fingerprint, model, ...)   → feedback + refined code
+
+    Each level is its own llm_cache.DiskCache, so the small code entries are
+    never evicted to make room for images. Unchanged reports skip straight
+    to the cached artifacts.
+    """
+
+    def __init__(
+        self,
+        directory: str = ".chart_cache",
+        code_max_bytes: int = 16 * 1024 * 1024,
+        render_max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float | None = 30 * 24 * 3600,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.code = llm_cache.DiskCache(
+            os.path.join(directory, "code.sqlite"), max_bytes=code_max_bytes, ttl_seconds=ttl_seconds
+        )
+        self.render = llm_cache.DiskCache(
+            os.path.join(directory, "render.sqlite"), max_bytes=render_max_bytes, ttl_seconds=ttl_seconds
+        )
+
+    # --- Level 1: generated code -------------------------------------------
+
+    def get_code(self, instruction: str, schema: str, model: str, out_path: str) -> str | None:
+        key = llm_cache.make_key({"instruction": instruction, "schema": schema, "model": model, "out": out_path})
+        value = self.code.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set_code(self, instruction: str, schema: str, model: str, out_path: str, code: str) -> None:
+        key = llm_cache.make_key({"instruction": instruction, "schema": schema, "model": model, "out": out_path})
+        self.code.set(key, code.encode("utf-8"))
+
+    # --- Level 2: rendered chart and its reflection --------------------------
+
+    @staticmethod
+    def _render_key(code: str, dataset_fingerprint: str) -> str:
+        return llm_cache.make_key({"render": code, "data": dataset_fingerprint})
+
+    def get_render(self, code: str, dataset_fingerprint: str) -> dict | None:
+        """{"png": bytes, "specs": {...}} or None."""
+        value = self.render.get(self._render_key(code, dataset_fingerprint))
+        if value is None:
+            return None
+        meta, png = _unpack(value)
+        return {"png": png, "specs": meta.get("specs", {})}
+
+    def set_render(self, code: str, dataset_fingerprint: str, png: bytes, specs: dict | None = None) -> None:
+        self.render.set(self._render_key(code, dataset_fingerprint), _pack({"specs": specs or {}}, png))
+
+    @staticmethod
+    def _reflect_key(code: str, dataset_fingerprint: str, **context) -> str:
+        return llm_cache.make_key({"reflect": code, "data": dataset_fingerprint, **context})
+
+    def get_reflection(self, code: str, dataset_fingerprint: str, **context) -> dict | None:
+        """
+        Cached reflection of `code` on this data; `context` holds whatever else
+        shaped the prompt (instruction, model, mode, output path, ...).
+        """
+        value = self.render.get(self._reflect_key(code, dataset_fingerprint, **context))
+        return _unpack(value)[0] if value is not None else None
+
+    def set_reflection(self, code: str, dataset_fingerprint: str, result: dict, **context) -> None:
+        self.render.set(self._reflect_key(code, dataset_fingerprint, **context), _pack(result))
+
+    def clear(self) -> None:
+        self.code.clear()
+        self.render.clear()
+
+    def stats(self) -> dict:
+        return {"code": self.code.stats(), "render": self.render.stats()}
@@ -0,0 +1,89 @@
+"""
+Benchmark: prompt size and pruning latency vs. schema size.
+
+Builds synthetic SQLite databases with 1..500 tables, then for a set of
+questions compares the full schema text against schema_index.prune_schema:
+  - estimated prompt tokens (full vs pruned)
+  - index build time and per-question pruning latency
+  - recall: how often the table a question targets survives pruning
+
+Run:  python bench_schema_index.py
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import schema_index
+import sql_schema
+from result_summary import estimate_tokens
+
+DOMAINS = [
+    "customer", "order", "invoice", "shipment", "product", "supplier", "employee",
+    "payment", "refund", "warehouse", "campaign", "ticket", "store", "region",
+]
+FIELDS = [
+    ("name", "TEXT"), ("status", "TEXT"), ("amount", "REAL"), ("quantity", "INTEGER"),
+    ("created_at", "DATETIME"), ("country", "TEXT"), ("color", "TEXT"), ("price", "REAL"),
+    ("category", "TEXT"), ("score", "REAL"), ("email", "TEXT"), ("channel", "TEXT"),
+    ("discount", "REAL"), ("priority", "INTEGER"), ("notes", "TEXT"), ("brand", "TEXT"),
+]
+
+
+def build_db(path: str, n_tables: int, seed: int = 0) -> list[tuple[str, str]]:
+    """Create `n_tables` tables; returns (table, column) targets for questions."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    targets = []
+    for i in range(n_tables):
+        table = f"{DOMAINS[i % len(DOMAINS)]}_{i}"
+        fields = rng.sample(FIELDS, k=rng.randint(5, len(FIELDS)))
+        cols = ", ".join(f"{name} {col_type}" for name, col_type in fields)
+        conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, {cols})")
+        rows = [
+            tuple(f"{name}_{j}" if t == "TEXT" else j for name, t in fields)
+            for j in range(20)
+        ]
+        marks = ", ".join("?" for _ in fields)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(n for n, _ in fields)}) VALUES ({marks})", rows
+        )
+        targets.append((table, rng.choice(fields)[0]))
+    conn.commit()
+    conn.close()
+    return targets
+
+
+def run(sizes=(1, 10, 100, 500), n_questions: int = 50):
+    print(f"{'tables':>6} {'full_tok':>9} {'pruned_tok':>10} {'ratio':>6} "
+          f"{'build_ms':>9} {'prune_ms_p50':>12} {'recall':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_tables in sizes:
+            path = os.path.join(tmp, f"bench_{n_tables}.db")
+            targets = build_db(path, n_tables)
+            full = schema_index.render_schema(sql_schema.get_schema_tables(path))
+
+            start = time.perf_counter()
+            schema_index.get_schema_index(path)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            rng = random.Random(1)
+            latencies, pruned_tokens, hits = [], [], 0
+            for table, column in rng.choices(targets, k=n_questions):
+                question = f"What is the average {column} per {table.replace('_', ' ')}?"
+                start = time.perf_counter()
+                pruned = schema_index.prune_schema(path, question)
+                latencies.append((time.perf_counter() - start) * 1000)
+                pruned_tokens.append(estimate_tokens(pruned))
+                hits += f"Table name: {table}\n" in pruned + "\n"
+
+            full_tok = estimate_tokens(full)
+            pruned_tok = statistics.mean(pruned_tokens)
+            print(f"{n_tables:>6} {full_tok:>9} {pruned_tok:>10.0f} {pruned_tok / full_tok:>6.2f} "
+                  f"{build_ms:>9.1f} {statistics.median(latencies):>12.3f} {hits / n_questions:>6.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,87 @@
+"""
+Benchmark: per-job cost of handing the coffee-sales frame to chart workers.
+
+Compares, at 1M+ rows:
+  - pickled baseline: the frame is pickled into every job (what
+    ChartWorkerPool.run(code, {"df": df}) does)
+  - shared frame: published once as a memory-mapped Feather file; each job
+    only sends a SharedFrame path and the worker reuses its attached copy
+
+Reports in-process serialization cost and end-to-end job latency through
+a real ChartWorkerPool running a trivial chart script.
+
+Run:  python bench_shared_frame.py [n_rows]
+"""
+import sys
+import time
+import pickle
+import statistics
+
+import numpy as np
+import pandas as pd
+
+import chart_sandbox
+import shared_frame
+
+COFFEES = ["Latte", "Americano", "Cappuccino", "Cortado", "Hot Chocolate", "Espresso", "Cocoa", "Americano with Milk"]
+
+
+def make_coffee_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Synthetic frame with the same columns as utils.load_and_prepare_data."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, n_rows), unit="D")
+    return pd.DataFrame({
+        "date": dates.strftime("%-m/%-d/%y"),
+        "time": [f"{h:02d}:{m:02d}" for h, m in zip(rng.integers(7, 22, n_rows), rng.integers(0, 60, n_rows))],
+        "cash_type": rng.choice(["card", "cash"], n_rows),
+        "card": rng.choice([f"ANON-0000-0000-{i:04d}" for i in range(500)], n_rows),
+        "price": rng.choice([18.12, 23.02, 27.92, 32.82, 35.76, 38.7], n_rows),
+        "coffee_name": rng.choice(COFFEES, n_rows),
+        "quarter": dates.quarter,
+        "month": dates.month,
+        "year": dates.year,
+    })
+
+
+def timed(fn, repeats: int) -> list[float]:
+    out = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def run(n_rows: int = 1_000_000, repeats: int = 5):
+    df = make_coffee_frame(n_rows)
+    print(f"rows={n_rows:,}  in-memory={df.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+
+    # 1) Serialization cost alone
+    blob = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle_ms = timed(lambda: pickle.loads(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)), repeats)
+    start = time.perf_counter()
+    handle = shared_frame.publish_frame(df)
+    publish_ms = (time.perf_counter() - start) * 1000
+    handle_blob = pickle.dumps(handle)
+    start = time.perf_counter()
+    handle.attach()
+    attach_cold_ms = (time.perf_counter() - start) * 1000
+    attach_warm_ms = timed(lambda: pickle.loads(pickle.dumps(handle)).attach(), repeats)
+
+    print(f"pickle round trip per job : {statistics.median(pickle_ms):9.1f} ms  ({len(blob) / 1e6:.0f} MB)")
+    print(f"publish once              : {publish_ms:9.1f} ms")
+    print(f"attach once per worker    : {attach_cold_ms:9.1f} ms")
+    print(f"shared handle per job     : {statistics.median(attach_warm_ms):9.3f} ms  ({len(handle_blob)} bytes)")
+
+    # 2) End-to-end through a worker (same worker for every job)
+    code = "n = len(df)"
+    with chart_sandbox.ChartWorkerPool(n_workers=1, memory_limit_mb=None) as pool:
+        pool.run(code, {"df": handle})  # warm attach
+        pickled_jobs = timed(lambda: pool.run(code, {"df": df}), repeats)
+        shared_jobs = timed(lambda: pool.run(code, {"df": handle}), repeats)
+    print(f"worker job, pickled df    : {statistics.median(pickled_jobs):9.1f} ms")
+    print(f"worker job, shared frame  : {statistics.median(shared_jobs):9.1f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -1,18 +1,67 @@
 # Standard library imports
+import os
 import re
 import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 # Local helper module
 import utils #from deeplearning
-
-# Use this utils.py function to load the data into a dataframe
-df = utils.load_and_prepare_data('coffee_sales.csv')
+# Pre-started worker processes for running generated chart code
+import chart_sandbox
+# Typed, memory-mapped Feather cache of the prepared dataset; chart workers
+# attach the same file instead of unpickling the frame per job
+import frame_cache
+# Downscaled, re-encoded chart images for vision calls
+import image_prep
+# Text description (titles, labels, plotted data) of the rendered figure
+import figure_spec
+# Static check / safe rewrites of slow pandas patterns in generated code
+import code_lint
+# Content-addressed cache of generated code, rendered charts and reflections
+import artifact_cache
+
+# Load the data into a dataframe (utils.load_and_prepare_data, cached on disk)
+df = frame_cache.load_and_prepare_data_cached('coffee_sales.csv')
 
 # Grab a random sample to display
 utils.print_html(df.sample(n=5), title="Random Sample of Coffee Sales Data")
 
+# Chart code runs out of process: matplotlib is warmed up once per worker,
+# and a hanging or memory-hungry script only takes down its own worker
+chart_pool = chart_sandbox.ChartWorkerPool(n_workers=2, timeout_s=60, memory_limit_mb=2048)
+
+# Unchanged instructions on unchanged data reuse code, PNGs and feedback
+chart_cache = artifact_cache.ArtifactCache(".chart_cache")
+
+
+def cubes_prompt(cubes_description: str | None) -> str:
+    """Prompt section advertising the pre-aggregated cubes (empty if none)."""
+    if not cubes_description:
+        return ""
+    listing = "\n    ".join(cubes_description.splitlines())
+    return f"""
+    Pre-aggregated cubes are also available as a dict 'cubes' of small DataFrames
+    (price_sum = revenue, price_count = number of sales, price_mean = average price):
+    {listing}
+    Prefer a cube over filtering/grouping 'df' whenever it has the dimensions you need.
+    When rolling a cube up further, re-aggregate price_sum and price_count (not price_mean).
+    """
+
+
+def lint_prompt(lint_feedback: str | None) -> str:
+    """Prompt section with the static performance findings (empty if none)."""
+    if not lint_feedback:
+        return ""
+    listing = "\n    ".join(lint_feedback.splitlines())
+    return f"""
+    A static check of the original code found these performance problems; fix them too:
+    {listing}
+    """
+
 
-def generate_chart_code(instruction: str, model: str, out_path_v1: str) -> str:
+def generate_chart_code(instruction: str, model: str, out_path_v1: str, cubes_description: str | None = None) -> str:
     """Generate Python code to make a plot with matplotlib using tag-based wrapping."""
 
     prompt = f"""
@@ -36,7 +85,7 @@ def generate_chart_code(instruction: str, model: str, out_path_v1: str) -> str:
     - quarter (1-4)
     - month (1-12)
     - year (YYYY)
-
+    {cubes_prompt(cubes_description)}
     User instruction: {instruction}
 
     Requirements for the code:
@@ -55,12 +104,64 @@ def generate_chart_code(instruction: str, model: str, out_path_v1: str) -> str:
     return response
 
 
+def extract_code(tagged_code: str) -> str | None:
+    """Body of the <execute_python> block, or None if there is none."""
+    match = re.search(r"<execute_python>([\s\S]*?)</execute_python>", tagged_code)
+    return match.group(1).strip() if match else None
+
+
+def lint_chart_code(tagged_code: str, n_rows: int | None = None) -> tuple[str, dict]:
+    """
+    Run code_lint.check on the <execute_python> body.
+    Returns (tagged code with safe rewrites applied, lint report).
+    """
+    code = extract_code(tagged_code)
+    if code is None:
+        return tagged_code, {"code": "", "applied": [], "findings": [], "estimated_s": 0.0, "feedback": ""}
+    report = code_lint.check(code, n_rows=n_rows)
+    if report["applied"]:
+        tagged_code = utils.ensure_execute_python_tags(report["code"])
+    return tagged_code, report
+
+
+def generate_checked_chart_code(
+    instruction: str,
+    model: str,
+    out_path_v1: str,
+    cubes_description: str | None = None,
+    n_rows: int | None = None,
+    lint_budget_s: float = 2.0,
+) -> tuple[str, dict]:
+    """
+    generate_chart_code, then lint the result before anything runs. When the
+    findings left after safe rewrites are estimated above `lint_budget_s` on
+    `n_rows` rows, regenerate once with the findings as feedback and keep the
+    cheaper draft. Returns (tagged code, lint report).
+    """
+    code, report = lint_chart_code(
+        generate_chart_code(instruction, model, out_path_v1, cubes_description), n_rows
+    )
+    if report["estimated_s"] > lint_budget_s:
+        retry_instruction = (
+            f"{instruction}\n\nA previous draft would have been slow on this dataset:\n"
+            f"{report['feedback']}\nAvoid these patterns."
+        )
+        retry, retry_report = lint_chart_code(
+            generate_chart_code(retry_instruction, model, out_path_v1, cubes_description), n_rows
+        )
+        if retry_report["estimated_s"] < report["estimated_s"]:
+            code, report = retry, retry_report
+    return code, report
+
+
 def reflect_on_image_and_regenerate(
     chart_path: str,
     instruction: str,
     model_name: str,
     out_path_v2: str,
     code_v1: str,  
+    cubes_description: str | None = None,
+    lint_feedback: str | None = None,
 ) -> tuple[str, str]:
     """
     Critique the chart IMAGE and the original code against the instruction, 
@@ -68,8 +169,13 @@ def reflect_on_image_and_regenerate(
     Returns (feedback, refined_code_with_tags).
     Supports OpenAI and Anthropic (Claude).
     """
-    media_type, b64 = utils.encode_image_b64(chart_path)
-    
+    # In case the name is "Claude" or "Anthropic", use the safe helper
+    lower = model_name.lower()
+    provider = "anthropic" if "claude" in lower or "anthropic" in lower else "openai"
+
+    # Resample the dpi=300 render to a vision-friendly size/format (cached by hash)
+    image = image_prep.prepare_image(chart_path, provider=provider)
+    media_type, b64 = image["media_type"], image["b64"]
 
     prompt = f"""
     You are a data visualization expert.
@@ -78,7 +184,7 @@ def reflect_on_image_and_regenerate(
 
     Original code (for context):
     {code_v1}
-
+    {lint_prompt(lint_feedback)}
     OUTPUT FORMAT (STRICT!):
     1) First line: a valid JSON object with ONLY the "feedback" field.
     Example: {{"feedback": "The legend is unclear and the axis labels overlap."}}
@@ -108,20 +214,87 @@ def reflect_on_image_and_regenerate(
     - quarter (1-4)
     - month (1-12)
     - year (YYYY)
-
+    {cubes_prompt(cubes_description)}
     Instruction:
     {instruction}
     """
 
 
-    # In case the name is "Claude" or "Anthropic", use the safe helper
-    lower = model_name.lower()
-    if "claude" in lower or "anthropic" in lower:
+    if provider == "anthropic":
         # ✅ Use the safe helper that joins all text blocks and adds a system prompt
         content = utils.image_anthropic_call(model_name, prompt, media_type, b64)
     else:
         content = utils.image_openai_call(model_name, prompt, media_type, b64)
 
+    return parse_reflection_output(content)
+
+
+def reflect_on_spec_and_regenerate(
+    spec: dict,
+    instruction: str,
+    model_name: str,
+    out_path_v2: str,
+    code_v1: str,
+    cubes_description: str | None = None,
+    lint_feedback: str | None = None,
+) -> tuple[str, str]:
+    """
+    Text-only variant of reflect_on_image_and_regenerate: critique the
+    figure spec extracted from the rendered chart instead of the image.
+    Returns (feedback, refined_code_with_tags).
+    """
+    prompt = f"""
+    You are a data visualization expert.
+    Your task: critique the rendered chart and the original code against the given instruction,
+    then return improved matplotlib code.
+
+    The chart is described by this JSON figure spec (title, axis labels and limits,
+    tick labels, legend entries and the plotted data of each series):
+    {figure_spec.to_json(spec)}
+
+    Original code (for context):
+    {code_v1}
+    {lint_prompt(lint_feedback)}
+    OUTPUT FORMAT (STRICT!):
+    1) First line: a valid JSON object with ONLY the "feedback" field.
+    Example: {{"feedback": "The legend is unclear and the axis labels overlap."}}
+
+    2) After a newline, output ONLY the refined Python code wrapped in:
+    <execute_python>
+    ...
+    </execute_python>
+
+    3) Import all necessary libraries in the code. Don't assume any imports from the original code.
+
+    HARD CONSTRAINTS:
+    - Do NOT include Markdown, backticks, or any extra prose outside the two parts above.
+    - Use pandas/matplotlib only (no seaborn).
+    - Assume df already exists; do not read from files.
+    - Save to '{out_path_v2}' with dpi=300.
+    - Always call plt.close() at the end (no plt.show()).
+    - Include all necessary import statements.
+
+    Schema (columns available in df):
+    - date (M/D/YY)
+    - time (HH:MM)
+    - cash_type (card or cash)
+    - card (string)
+    - price (number)
+    - coffee_name (string)
+    - quarter (1-4)
+    - month (1-12)
+    - year (YYYY)
+    {cubes_prompt(cubes_description)}
+    Instruction:
+    {instruction}
+    """
+
+    content = utils.get_response(model_name, prompt)
+    return parse_reflection_output(content)
+
+
+def parse_reflection_output(content: str) -> tuple[str, str]:
+    """Split a reflection reply into (feedback, refined_code_with_tags)."""
     # --- Parse ONLY the first JSON line (feedback) ---
     lines = content.strip().splitlines()
     json_line = lines[0].strip() if lines else ""
@@ -149,82 +322,463 @@ def reflect_on_image_and_regenerate(
 
 
 
+def generate_chart_code_cached(
+    instruction: str,
+    model: str,
+    out_path_v1: str,
+    cubes_description: str | None = None,
+    n_rows: int | None = None,
+    lint_budget_s: float = 2.0,
+) -> tuple[str, dict, bool]:
+    """
+    generate_checked_chart_code through the code level of chart_cache.
+    Returns (tagged code, lint report, cache hit).
+    """
+    schema = cubes_description or ""
+    code = chart_cache.get_code(instruction, schema, model, out_path_v1)
+    if code is not None:
+        # Cached code already has the safe rewrites; linting it again is cheap
+        code, report = lint_chart_code(code, n_rows)
+        return code, report, True
+    code, report = generate_checked_chart_code(
+        instruction, model, out_path_v1, cubes_description, n_rows, lint_budget_s
+    )
+    chart_cache.set_code(instruction, schema, model, out_path_v1, code)
+    return code, report, False
+
+
+def run_chart_code_cached(
+    tagged_code: str,
+    exec_globals: dict,
+    out_path: str,
+    dataset_fingerprint: str,
+    capture_spec: bool = False,
+) -> dict | None:
+    """
+    Execute the <execute_python> body in the chart pool, or restore `out_path`
+    from chart_cache when this exact code already rendered on this data.
+    Returns the pool reply plus "cached", or None if there is no code block.
+    """
+    code = extract_code(tagged_code)
+    if code is None:
+        return None
+
+    hit = chart_cache.get_render(code, dataset_fingerprint)
+    if hit is not None and (hit["specs"] or not capture_spec):
+        with open(out_path, "wb") as f:
+            f.write(hit["png"])
+        return {"ok": True, "error": None, "elapsed": 0.0, "specs": hit["specs"], "cached": True}
+
+    started = time.time()
+    result = chart_pool.run(code, exec_globals, capture_spec=capture_spec)
+    # Only cache a PNG this run actually wrote
+    if result["ok"] and os.path.exists(out_path) and os.path.getmtime(out_path) >= started - 1:
+        with open(out_path, "rb") as f:
+            chart_cache.set_render(code, dataset_fingerprint, f.read(), result["specs"])
+    result["cached"] = False
+    return result
+
+
+def render_error(result: dict | None, out_path: str, started: float) -> str | None:
+    """
+    Why a run_chart_code_cached call produced no usable chart, or None if it
+    did: no code block, the code failed, or `out_path` wasn't (re)written
+    since `started` (time.time()) — an older file there is a stale chart.
+    """
+    if result is None:
+        return "No <execute_python> block in the code"
+    if not result["ok"]:
+        return result["error"]
+    if not os.path.exists(out_path) or os.path.getmtime(out_path) < started - 1:
+        return f"The code did not save {out_path}"
+    return None
+
+
+def reflect_on_chart(
+    result_v1: dict | None,
+    instruction: str,
+    reflection_model: str,
+    text_reflection_model: str | None,
+    out_path_v1: str,
+    out_path_v2: str,
+    code_v1: str,
+    dataset_fingerprint: str,
+    cubes_description: str | None = None,
+    lint_feedback: str | None = None,
+) -> dict:
+    """
+    Step 3 of run_workflow: reflect on the figure spec with the text model
+    when it is unambiguous, else on the image with the vision model.
+    Reflections are cached per (code, data, prompt inputs).
+    Returns {"feedback", "code_v2", "mode", "reason", "cached"}.
+    """
+    spec = result_v1["specs"].get(out_path_v1) if result_v1 and text_reflection_model else None
+    reason = figure_spec.ambiguity(spec) if text_reflection_model else None
+    mode = "spec" if spec is not None and reason is None else "image"
+    context = {
+        "instruction": instruction,
+        "model": text_reflection_model if mode == "spec" else reflection_model,
+        "mode": mode,
+        "out": out_path_v2,
+        "cubes": cubes_description,
+        "lint": lint_feedback,
+    }
+    hit = chart_cache.get_reflection(code_v1, dataset_fingerprint, **context)
+    if hit is not None:
+        return {**hit, "mode": mode, "reason": reason, "cached": True}
+
+    if mode == "spec":
+        feedback, code_v2 = reflect_on_spec_and_regenerate(
+            spec, instruction, text_reflection_model, out_path_v2, code_v1, cubes_description, lint_feedback
+        )
+    else:
+        feedback, code_v2 = reflect_on_image_and_regenerate(
+            out_path_v1, instruction, reflection_model, out_path_v2, code_v1, cubes_description, lint_feedback
+        )
+    chart_cache.set_reflection(code_v1, dataset_fingerprint, {"feedback": feedback, "code_v2": code_v2}, **context)
+    return {"feedback": feedback, "code_v2": code_v2, "mode": mode, "reason": reason, "cached": False}
+
+
 def run_workflow(
     dataset_path: str,
     user_instructions: str,
     generation_model: str,
     reflection_model: str,   
     image_basename: str = "chart",
+    text_reflection_model: str | None = None,
+    use_cubes: bool = True,
+    lint_budget_s: float = 2.0,
+    max_rounds: int = 1,
+    max_hash_distance: int = 2,
+    max_pixel_diff: float = 0.01,
 ):
     """
     End-to-end pipeline:
       1) load dataset
       2) generate V1 code
-      3) execute V1 → produce chart_v1.png
+      3) execute V1 in a chart worker → produce chart_v1.png
       4) reflect on V1 (image + original code) → feedback + refined code
       5) execute V2 → produce chart_v2.png
 
+    With `text_reflection_model`, step 4 first reflects on the figure spec
+    captured while V1 was saved, using a text-only call; the vision model
+    is only used when the spec is ambiguous (pies, images, colorbars, ...).
+
+    With `use_cubes`, the chart code also gets `cubes` (pre-aggregated sums /
+    counts / means of price, see frame_cache.CUBES) and the prompts say so.
+
+    Generated code is linted before it runs (code_lint): safe rewrites are
+    applied, V1 is regenerated once if it looks slower than `lint_budget_s`,
+    and leftover findings are passed to the reflection step.
+
+    Generated code, rendered PNGs and reflections are cached in chart_cache,
+    keyed on the instruction/model and on the code + dataset content, so an
+    unchanged report skips straight to the cached artifacts.
+
+    With `max_rounds` > 1, steps 4–5 repeat (V2 → V3 → …) and stop early when
+      - the refined code is AST-equivalent to the previous version ("code_unchanged"), or
+      - the new render is perceptually near-identical to the previous one
+        (pHash distance ≤ `max_hash_distance` and pixel diff ≤ `max_pixel_diff`,
+        "render_unchanged").
+    A refined version that has no code block or fails to render ends the
+    loop ("render_failed"): later rounds would have no chart to reflect on.
+    code_v2 / chart_v2 are the last version that rendered; "rounds" holds
+    every round, failed ones with their "error".
+
+    Raises RuntimeError when V1 doesn't render: there is nothing to reflect on.
     Returns a dict with all artifacts (codes, feedback, image paths).
     """
-    # 0) Load dataset; utils handles parsing and feature derivations (e.g., year/quarter)
-    df = utils.load_and_prepare_data(dataset_path)
+    # 0) Load dataset; utils handles parsing and feature derivations (e.g., year/quarter).
+    #    Repeat runs memory-map the cached columnar copy instead of re-parsing the CSV.
+    df_shared = frame_cache.cached_frame(dataset_path)
+    df = df_shared.attach()
     utils.print_html(df.sample(n=5), title="Random Sample of Dataset")
 
-    # Paths to store charts
+    # Pre-aggregated cubes (cached next to the frame), passed as handles like df
+    exec_globals = {"df": df_shared}
+    cubes_description = None
+    if use_cubes:
+        exec_globals["cubes"] = frame_cache.cached_cubes(dataset_path)
+        cubes_description = frame_cache.describe_cubes(exec_globals["cubes"])
+    # Data version for the render/reflection caches (CSV content + what the code sees)
+    fingerprint = f"{frame_cache.dataset_fingerprint(dataset_path)}:{'cubes' if use_cubes else 'df'}"
+
+    # Path to store the first chart; refined versions go to {image_basename}_v{n}.png
     out_v1 = f"{image_basename}_v1.png"
-    out_v2 = f"{image_basename}_v2.png"
 
     # 1) Generate code (V1)
     utils.print_html("Step 1: Generating chart code (V1)… 📈")
-    code_v1 = generate_chart_code(
+    code_v1, lint_v1, cached = generate_chart_code_cached(
         instruction=user_instructions,
         model=generation_model,
         out_path_v1=out_v1,
+        cubes_description=cubes_description,
+        n_rows=len(df),
+        lint_budget_s=lint_budget_s,
     )
-    utils.print_html(code_v1, title="LLM output with first draft code (V1)")
+    utils.print_html(code_v1, title="LLM output with first draft code (V1)" + (" [cached]" if cached else ""))
+    if lint_v1["applied"] or lint_v1["findings"]:
+        utils.print_html(
+            "\n".join(lint_v1["applied"] + [lint_v1["feedback"]]).strip(),
+            title="Static performance check (V1)",
+        )
 
     # 2) Execute V1 (hard-coded: extract <execute_python> block and run immediately)
     utils.print_html("Step 2: Executing chart code (V1)… 💻")
-    match = re.search(r"<execute_python>([\s\S]*?)</execute_python>", code_v1)
-    if match:
-        initial_code = match.group(1).strip()
-        exec_globals = {"df": df}
-        exec(initial_code, exec_globals)
+    started = time.time()
+    result = run_chart_code_cached(
+        code_v1, exec_globals, out_v1, fingerprint, capture_spec=text_reflection_model is not None
+    )
+    error = render_error(result, out_v1, started)
+    if error:
+        # Nothing to reflect on (an older out_v1 would be a stale chart)
+        utils.print_html(error, title="Chart code (V1) failed")
+        raise RuntimeError(f"Chart code (V1) failed: {error}")
     utils.print_html(out_v1, is_image=True, title="Generated Chart (V1)")
 
-    # 3) Reflect on V1 (image + original code) to get feedback and refined code (V2)
-    utils.print_html("Step 3: Reflecting on V1 (image + code) and generating improvements… 🔁")
-    feedback, code_v2 = reflect_on_image_and_regenerate(
-        chart_path=out_v1,
-        instruction=user_instructions,
-        model_name=reflection_model,
-        out_path_v2=out_v2,
-        code_v1=code_v1,  # pass original code for context
-    )
-    utils.print_html(feedback, title="Reflection feedback on V1")
-    utils.print_html(code_v2, title="LLM output with revised code (V2)")
-
-    # 4) Execute V2 (hard-coded: extract <execute_python> block and run immediately)
-    utils.print_html("Step 4: Executing refined chart code (V2)… 🖼️")
-    match = re.search(r"<execute_python>([\s\S]*?)</execute_python>", code_v2)
-    if match:
-        reflected_code = match.group(1).strip()
-        exec_globals = {"df": df}
-        exec(reflected_code, exec_globals)
-    utils.print_html(out_v2, is_image=True, title="Regenerated Chart (V2)")
+    # 3) Reflect on the latest version to get feedback and refined code: figure
+    #    spec + code with the text model when the spec is unambiguous, else image + code
+    code_prev, lint_prev, out_prev = code_v1, lint_v1, out_v1
+    feedback, reflection_mode = "", None  # max_rounds=0: V1 is the final version
+    rounds = []
+    stop_reason = "max_rounds"
+    for round_no in range(1, max_rounds + 1):
+        version = round_no + 1
+        out_next = f"{image_basename}_v{version}.png"
+        utils.print_html(f"Step 3: Reflecting on V{version - 1} and generating improvements… 🔁")
+        reflection = reflect_on_chart(
+            result_v1=result,
+            instruction=user_instructions,
+            reflection_model=reflection_model,
+            text_reflection_model=text_reflection_model,
+            out_path_v1=out_prev,
+            out_path_v2=out_next,
+            code_v1=code_prev,  # pass original code for context
+            dataset_fingerprint=fingerprint,
+            cubes_description=cubes_description,
+            lint_feedback=lint_prev["feedback"],
+        )
+        if reflection["reason"]:
+            utils.print_html(reflection["reason"], title="Figure spec is ambiguous, used the vision model")
+        feedback, reflection_mode = reflection["feedback"], reflection["mode"]
+        utils.print_html(feedback, title=f"Reflection feedback on V{version - 1} ({reflection_mode})")
+        code_next, lint_next = lint_chart_code(reflection["code_v2"], n_rows=len(df))
+        utils.print_html(code_next, title=f"LLM output with revised code (V{version})")
+        round_info = {"round": round_no, "feedback": feedback, "mode": reflection_mode, "code": code_next}
+        rounds.append(round_info)
+
+        # Same program (up to formatting / output name): rendering it again can't help
+        if code_lint.ast_equivalent(extract_code(code_prev) or "", extract_code(code_next) or ""):
+            stop_reason = "code_unchanged"
+            break
+
+        # 4) Execute the refined code
+        utils.print_html(f"Step 4: Executing refined chart code (V{version})… 🖼️")
+        started = time.time()
+        next_result = run_chart_code_cached(
+            code_next, exec_globals, out_next, fingerprint,
+            capture_spec=text_reflection_model is not None and round_no < max_rounds,
+        )
+        error = render_error(next_result, out_next, started)
+        if error:
+            # Keep the last version that rendered; there is no new chart to reflect on
+            utils.print_html(error, title=f"Chart code (V{version}) failed")
+            round_info["error"] = error
+            stop_reason = "render_failed"
+            break
+        result = next_result
+        utils.print_html(out_next, is_image=True, title=f"Regenerated Chart (V{version})")
+        round_info["chart"] = out_next
+
+        # 5) Stop once another round no longer visibly changes the chart
+        converged = False
+        if round_no < max_rounds and os.path.exists(out_prev):
+            distance = image_prep.image_distance(out_prev, out_next)
+            round_info["distance"] = distance
+            converged = image_prep.images_converged(distance, max_hash_distance, max_pixel_diff)
+        code_prev, lint_prev, out_prev = code_next, lint_next, out_next
+        if converged:
+            stop_reason = "render_unchanged"
+            break
+
+    if stop_reason != "max_rounds":
+        utils.print_html(f"Stopped after {len(rounds)} round(s): {stop_reason}", title="Reflection rounds")
+    code_v2, lint_v2, out_v2 = code_prev, lint_prev, out_prev
 
     return {
         "code_v1": code_v1,
         "chart_v1": out_v1,
         "feedback": feedback,
+        "reflection_mode": reflection_mode,
+        "lint_v1": lint_v1,
         "code_v2": code_v2,
+        "lint_v2": lint_v2,
         "chart_v2": out_v2,
+        "rounds": rounds,
+        "stop_reason": stop_reason,
     }
 
+
+def _chart_job_step(job: dict, stage: str) -> None:
+    """
+    One stage of run_workflow (without HTML output) applied to a batch job.
+    Fills in the job dict in place; blocking, meant for a worker thread.
+    """
+    if stage == "generate":
+        job["code_v1"], job["lint_v1"], _ = generate_chart_code_cached(
+            job["instruction"], job["generation_model"], job["chart_v1"], job["cubes_description"],
+            job["n_rows"], job["lint_budget_s"],
+        )
+
+    elif stage in ("execute_v1", "execute_v2"):
+        version = stage[-2:]
+        capture_spec = version == "v1" and job["text_reflection_model"] is not None
+        started = time.time()
+        result = run_chart_code_cached(
+            job[f"code_{version}"], job["exec_globals"], job[f"chart_{version}"], job["fingerprint"], capture_spec
+        )
+        job[f"result_{version}"] = result
+        # A failed V1 must not reach "reflect": chart_v1 may be an older run's chart
+        error = render_error(result, job[f"chart_{version}"], started)
+        if error:
+            raise RuntimeError(f"code_{version}: {error}")
+
+    elif stage == "reflect":
+        reflection = reflect_on_chart(
+            job["result_v1"], job["instruction"], job["reflection_model"], job["text_reflection_model"],
+            job["chart_v1"], job["chart_v2"], job["code_v1"], job["fingerprint"],
+            job["cubes_description"], job["lint_v1"]["feedback"],
+        )
+        job["feedback"], job["reflection_mode"] = reflection["feedback"], reflection["mode"]
+        job["code_v2"], job["lint_v2"] = lint_chart_code(reflection["code_v2"], job["n_rows"])
+
+
+# Stage order of the chart pipeline; V1 and V2 execution are separate stages
+# so items only ever flow forward (no cycle between bounded queues)
+CHART_STAGES = ("generate", "execute_v1", "reflect", "execute_v2")
+DEFAULT_STAGE_CONCURRENCY = {"generate": 8, "execute_v1": 2, "reflect": 4, "execute_v2": 2}
+
+
+async def run_workflow_batch(
+    dataset_path: str,
+    instructions: list[str],
+    generation_model: str,
+    reflection_model: str,
+    image_basename: str = "chart",
+    text_reflection_model: str | None = None,
+    concurrency: dict | None = None,
+    queue_size: int = 4,
+    use_cubes: bool = True,
+    lint_budget_s: float = 2.0,
+):
+    """
+    Run run_workflow over many chart instructions as a pipeline.
+
+    - each stage (generate → execute V1 → encode + reflect → execute V2) has its
+      own workers; `concurrency` overrides DEFAULT_STAGE_CONCURRENCY per stage
+      (keep the execute stages at the chart pool size)
+    - stages are connected by queues of at most `queue_size` jobs, so a fast
+      stage waits for a slow one instead of piling up work
+    - different jobs overlap across stages, so throughput is bounded by the
+      slowest stage rather than the sum of all stages
+    - results are yielded as soon as each chart finishes (not in input order);
+      every result carries its input "index", "error" (None on success),
+      "elapsed" and per-stage "timings"
+
+    Usage:
+        async for result in run_workflow_batch("coffee_sales.csv", instructions, "gpt-4.1-mini", "o4-mini"):
+            ...
+    """
+    concurrency = {**DEFAULT_STAGE_CONCURRENCY, **(concurrency or {})}
+    exec_globals = {"df": frame_cache.cached_frame(dataset_path)}
+    cubes_description = None
+    if use_cubes:
+        exec_globals["cubes"] = frame_cache.cached_cubes(dataset_path)
+        cubes_description = frame_cache.describe_cubes(exec_globals["cubes"])
+    n_rows = len(exec_globals["df"].attach())
+    fingerprint = f"{frame_cache.dataset_fingerprint(dataset_path)}:{'cubes' if use_cubes else 'df'}"
+    loop = asyncio.get_running_loop()
+
+    # queues[i] feeds CHART_STAGES[i]; the last one collects finished jobs
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in CHART_STAGES]
+    queues.append(asyncio.Queue())
+
+    async def feed():
+        for index, instruction in enumerate(instructions):
+            await queues[0].put({
+                "index": index,
+                "instruction": instruction,
+                "generation_model": generation_model,
+                "reflection_model": reflection_model,
+                "text_reflection_model": text_reflection_model,
+                "exec_globals": exec_globals,
+                "cubes_description": cubes_description,
+                "n_rows": n_rows,
+                "fingerprint": fingerprint,
+                "lint_budget_s": lint_budget_s,
+                "chart_v1": f"{image_basename}_{index}_v1.png",
+                "chart_v2": f"{image_basename}_{index}_v2.png",
+                "error": None,
+                "timings": {},
+                "start": time.perf_counter(),
+            })
+
+    async def stage_worker(position: int):
+        stage = CHART_STAGES[position]
+        while True:
+            job = await queues[position].get()
+            if job["error"] is None:
+                start = time.perf_counter()
+                try:
+                    await loop.run_in_executor(executor, _chart_job_step, job, stage)
+                except Exception as e:
+                    job["error"] = f"{stage}: {type(e).__name__}: {e}"
+                job["timings"][stage] = time.perf_counter() - start
+            await queues[position + 1].put(job)
+
+    n_threads = sum(concurrency[stage] for stage in CHART_STAGES)
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        tasks = [asyncio.create_task(feed())]
+        for position, stage in enumerate(CHART_STAGES):
+            tasks += [asyncio.create_task(stage_worker(position)) for _ in range(concurrency[stage])]
+        try:
+            for _ in range(len(instructions)):
+                job = await queues[-1].get()
+                job.pop("exec_globals")
+                job.pop("cubes_description")
+                job.pop("n_rows")
+                job.pop("fingerprint")
+                job.pop("lint_budget_s")
+                job["elapsed"] = time.perf_counter() - job.pop("start")
+                yield job
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def iter_workflow_batch(dataset_path: str, instructions: list[str], **kwargs):
+    """
+    Blocking generator version of run_workflow_batch for non-async callers.
+    Yields results as they finish.
+    """
+    loop = asyncio.new_event_loop()
+    batch = run_workflow_batch(dataset_path, instructions, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(batch.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(batch.aclose())
+        loop.close()
+
 # Here, insert your updates
 user_instructions="Create a plot comparing Q1 coffee sales in 2024 and 2025 using the data in coffee_sales.csv." # write your instruction here
 generation_model="gpt-4.1-mini"
 reflection_model="o4-mini"
+text_reflection_model="gpt-4.1-mini"  # None → always reflect on the image
 image_basename="drink_sales"
 
 # Run the complete agentic workflow
@@ -233,5 +787,20 @@ _ = run_workflow(
     user_instructions=user_instructions,
     generation_model=generation_model,
     reflection_model=reflection_model,
-    image_basename=image_basename
+    image_basename=image_basename,
+    text_reflection_model=text_reflection_model,
 )
+
+# Batch mode: many charts, stages overlapped across charts, results streamed as they finish
+#instructions = ["Plot monthly revenue by coffee type in 2024.", "Compare card vs cash sales per quarter."]
+#for result in iter_workflow_batch("coffee_sales.csv", instructions,
+#                                  generation_model=generation_model, reflection_model=reflection_model,
+#                                  text_reflection_model=text_reflection_model, image_basename="weekly"):
+#    print(result["index"], result["error"] or result["chart_v2"], result["timings"])
+
+# Findings / automatic rewrites of the static performance check
+utils.print_html(code_lint.lint_stats(), title="Code Lint Stats")
+# Hit/miss counters of the code / render caches
+utils.print_html(chart_cache.stats(), title="Chart Artifact Cache Stats")
+# Bytes / estimated vision tokens saved by image preparation
+utils.print_html(image_prep.stats(), title="Image Preparation Stats")
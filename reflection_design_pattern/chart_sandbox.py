@@ -0,0 +1,308 @@
+import os
+import time
+import queue
+import threading
+import traceback
+import multiprocessing
+
+from shared_frame import SharedFrame
+
+
+def _limit_memory(memory_limit_mb: int | None) -> None:
+    """
+    Cap the worker's address space at its current size + `memory_limit_mb`.
+    Measured after the warm imports, so the limit is headroom for the chart
+    code itself rather than for numpy/matplotlib mappings.
+    """
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        current = 0
+    limit = current + memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _attach(value):
+    """Resolve SharedFrame handles, also inside a dict (e.g. {"cubes": {name: handle}})."""
+    if isinstance(value, SharedFrame):
+        return value.attach()
+    if isinstance(value, dict) and any(isinstance(v, SharedFrame) for v in value.values()):
+        return {k: _attach(v) for k, v in value.items()}
+    return value
+
+
+def _worker_main(conn, memory_limit_mb: int | None, max_jobs: int) -> None:
+    """
+    Chart worker process: import matplotlib (Agg) and pandas once, then run
+    chart code jobs until told to stop or `max_jobs` is reached.
+    """
+    # Pay the import / backend setup cost once per worker, not per chart
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    # Attached frames are read-only memory maps: copy-on-write lets chart code
+    # modify its own view (pandas ≥ 2; always on in pandas 3)
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, ValueError):
+        pass
+
+    import figure_spec
+    from matplotlib.figure import Figure
+
+    _limit_memory(memory_limit_mb)
+
+    # Record a figure spec for every savefig() of a job that asks for it
+    specs = {}
+    capture = [False]
+    original_savefig = Figure.savefig
+
+    def savefig(fig, fname, *args, **kwargs):
+        if capture[0]:
+            try:
+                specs[str(fname)] = figure_spec.extract_figure_spec(fig)
+            except Exception as e:
+                specs[str(fname)] = {"error": f"{type(e).__name__}: {e}"}
+        return original_savefig(fig, fname, *args, **kwargs)
+
+    Figure.savefig = savefig
+
+    conn.send(("ready", os.getpid()))
+    jobs = 0
+    while jobs < max_jobs:
+        job = conn.recv()
+        if job is None:
+            break
+        code, exec_globals, capture[0] = job
+        specs.clear()
+        start = time.perf_counter()
+        try:
+            # SharedFrame handles are attached once per worker and reused
+            job_globals = {name: _attach(value) for name, value in (exec_globals or {}).items()}
+            exec(code, {"__name__": "__chart__", **job_globals})
+            reply = {"ok": True, "error": None}
+        except MemoryError:
+            reply = {"ok": False, "error": "MemoryError: chart code exceeded the worker memory limit"}
+            jobs = max_jobs  # recycle this worker
+        except BaseException:
+            reply = {"ok": False, "error": traceback.format_exc(limit=5)}
+        finally:
+            plt.close("all")
+        reply["elapsed"] = time.perf_counter() - start
+        reply["specs"] = dict(specs)
+        jobs += 1
+        reply["recycle"] = jobs >= max_jobs
+        conn.send(reply)
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb, max_jobs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, memory_limit_mb, max_jobs),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self, timeout_s: float) -> None:
+        try:
+            if self.conn.poll(timeout_s):
+                self.conn.recv()
+                return
+        except EOFError:
+            pass
+        self.kill()
+        raise RuntimeError("Chart worker failed to start")
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class ChartWorkerPool:
+    """
+    Pool of pre-started worker processes for running generated chart code.
+
+    - matplotlib (Agg) and pandas are imported once per worker
+    - each job runs with a timeout; a stuck worker is killed and replaced
+    - workers may grow by at most `memory_limit_mb` of address space
+    - workers are recycled after `max_jobs_per_worker` jobs to drop leaks
+    - a job waits at most `acquire_timeout_s` for a free worker
+
+    Uses the "fork" start method so the notebook-style driver scripts are not
+    re-imported in the workers (POSIX only).
+    """
+
+    def __init__(
+        self,
+        n_workers: int = 2,
+        timeout_s: float = 60.0,
+        memory_limit_mb: int | None = 2048,
+        max_jobs_per_worker: int = 50,
+        acquire_timeout_s: float = 300.0,
+    ):
+        self.n_workers = n_workers
+        self.timeout_s = timeout_s
+        self.acquire_timeout_s = acquire_timeout_s
+        self.memory_limit_mb = memory_limit_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._ctx = multiprocessing.get_context("fork")
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._missing = 0  # workers that couldn't be replaced yet; respawned on demand
+        self.stats = {"jobs": 0, "errors": 0, "timeouts": 0, "recycled": 0}
+
+        for _ in range(n_workers):
+            self._idle.put(self._spawn())
+
+    def _bump(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.memory_limit_mb, self.max_jobs_per_worker)
+        worker.wait_ready(timeout_s=60)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker) -> None:
+        try:
+            worker.kill()
+        finally:
+            with self._lock:
+                self._workers.remove(worker)
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            respawn = self._missing > 0 and self._idle.empty()
+            if respawn:
+                self._missing -= 1
+        if respawn:
+            try:
+                return self._spawn()
+            except Exception:
+                with self._lock:
+                    self._missing += 1
+                raise
+        return self._idle.get(timeout=self.acquire_timeout_s)
+
+    def _release(self, worker: _Worker, recycle: bool) -> None:
+        """Return `worker` to the pool, or replace it; always frees its slot."""
+        if recycle:
+            self._bump("recycled")
+            try:
+                self._retire(worker)
+                worker = self._spawn()
+            except Exception:
+                # Leave the slot empty; the next job that finds no idle worker respawns it
+                with self._lock:
+                    self._missing += 1
+                return
+        self._idle.put(worker)
+
+    def run(
+        self,
+        code: str,
+        exec_globals: dict | None = None,
+        timeout_s: float | None = None,
+        capture_spec: bool = False,
+    ) -> dict:
+        """
+        Execute `code` in a worker with `exec_globals` (e.g. {"df": df}).
+        Pass large frames as shared_frame.SharedFrame handles so only a path
+        is sent per job instead of a pickled copy.
+        With capture_spec=True, every saved figure is also described with
+        figure_spec.extract_figure_spec under reply["specs"][filename].
+        Returns {"ok", "error", "elapsed", "specs"}; errors in the code,
+        unpicklable globals, crashed or unstartable workers and a pool with
+        no free worker are all reported in the reply rather than raised.
+        """
+        if self._closed:
+            raise RuntimeError("ChartWorkerPool is closed")
+        timeout_s = timeout_s or self.timeout_s
+        self._bump("jobs")
+        try:
+            worker = self._acquire()
+        except queue.Empty:
+            self._bump("errors")
+            return {
+                "ok": False,
+                "error": f"TimeoutError: no chart worker became free within {self.acquire_timeout_s}s",
+                "elapsed": None,
+                "specs": {},
+            }
+        except Exception as e:
+            self._bump("errors")
+            return {"ok": False, "error": f"Chart worker failed to start: {e}", "elapsed": None, "specs": {}}
+
+        reply = None
+        try:
+            try:
+                worker.conn.send((code, exec_globals, capture_spec))
+            except OSError:
+                raise  # the worker is gone, handled below
+            except Exception as e:
+                # Pickling failed before anything was written: the worker is fine
+                reply = {
+                    "ok": False,
+                    "error": f"{type(e).__name__}: can't send exec_globals to the chart worker: {e}",
+                    "elapsed": None,
+                    "specs": {},
+                }
+            else:
+                if worker.conn.poll(timeout_s):
+                    reply = worker.conn.recv()
+                else:
+                    self._bump("timeouts")
+                    reply = {
+                        "ok": False,
+                        "error": f"TimeoutError: chart code ran longer than {timeout_s}s",
+                        "elapsed": timeout_s,
+                        "specs": {},
+                        "recycle": True,
+                    }
+        except (EOFError, BrokenPipeError, ConnectionResetError, OSError):
+            # Worker died mid-job (e.g. killed by the OOM killer)
+            reply = {"ok": False, "error": "Chart worker crashed", "elapsed": None, "specs": {}, "recycle": True}
+        finally:
+            recycle = reply is None or reply.pop("recycle", False)
+            self._release(worker, recycle)
+
+        if not reply["ok"]:
+            self._bump("errors")
+        return reply
+
+    def close(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,360 @@
+import ast
+
+# Rough per-row costs (seconds) used to rank findings against the frame size
+ROW_COST_S = {
+    "iterrows": 20e-6,        # builds a Series per row
+    "itertuples": 1e-6,
+    "apply_axis1": 10e-6,     # Python call + Series per row
+    "loop_filter": 2e-9,      # one vectorized comparison over the frame, per loop iteration
+    "to_datetime": 3e-6,      # string parsing, per extra call
+}
+# Unknown loop trip counts (e.g. `for v in df.coffee_name.unique()`) are assumed to be this
+LOOP_ITERATIONS_GUESS = 20
+
+_STATS = {"checked": 0, "findings": 0, "autofixed": 0}
+
+
+def _base_name(node) -> str | None:
+    """`df` for df, df.x, df['x'], df.loc[...]; None otherwise."""
+    while isinstance(node, (ast.Attribute, ast.Subscript)):
+        node = node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _is_to_datetime(node) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "to_datetime"
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id in ("pd", "pandas")
+    )
+
+
+def _column_key(node) -> str | None:
+    """'date' for df['date'] / df.date; None for anything else."""
+    if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Constant):
+        return str(node.slice.value)
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return node.attr
+    return None
+
+
+def _parsed_column(node) -> tuple | None:
+    """(frame name, column key) parsed by pd.to_datetime(df['col']); None otherwise."""
+    if not node.args:
+        return None
+    key = _column_key(node.args[0])
+    return (_base_name(node.args[0]), key) if key is not None else None
+
+
+class _Visitor(ast.NodeVisitor):
+    def __init__(self):
+        self.findings = []
+        self.loop_depth = 0
+        self.to_datetime = {}  # source of the call → [line numbers]
+        self.repeated = []  # (source, lines) of calls parsed more than once
+
+    def flush_to_datetime(self, column: tuple | None = None) -> None:
+        """
+        Close the counts for calls parsing `column` (all calls if None):
+        after `df['date'] = pd.to_datetime(df['date'])` a later parse reads
+        the already converted column, so it isn't a repeat of the first.
+        """
+        for source, (parsed, lines) in list(self.to_datetime.items()):
+            if column is None or parsed == column:
+                if len(lines) > 1:
+                    self.repeated.append((source, lines))
+                del self.to_datetime[source]
+
+    def _add(self, rule: str, node, message: str, per_row_s: float, fix: str):
+        self.findings.append({
+            "rule": rule,
+            "line": node.lineno,
+            "message": message,
+            "per_row_s": per_row_s,
+            "fix": fix,
+        })
+
+    def _loop(self, node):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+
+    visit_For = visit_While = visit_ListComp = visit_DictComp = visit_GeneratorExp = _loop
+
+    def visit_Assign(self, node):
+        # The value is evaluated before the targets are stored
+        self.visit(node.value)
+        for target in node.targets:
+            key = _column_key(target)
+            if key is not None:
+                self.flush_to_datetime((_base_name(target), key))
+            self.visit(target)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in ("iterrows", "itertuples"):
+            self._add(
+                func.attr, node,
+                f"`.{func.attr}()` loops over every row in Python",
+                ROW_COST_S[func.attr],
+                "use vectorized column operations or groupby().agg() instead of a row loop",
+            )
+        if isinstance(func, ast.Attribute) and func.attr == "apply":
+            axis = next((kw.value for kw in node.keywords if kw.arg == "axis"), None)
+            if isinstance(axis, ast.Constant) and axis.value in (1, "columns"):
+                self._add(
+                    "apply_axis1", node,
+                    "`.apply(..., axis=1)` calls a Python function per row",
+                    ROW_COST_S["apply_axis1"],
+                    "compute the result from whole columns (arithmetic, np.where, .map)",
+                )
+        if _is_to_datetime(node) and node.args:
+            source = ast.unparse(node)
+            self.to_datetime.setdefault(source, (_parsed_column(node), []))[1].append(node.lineno)
+            if self.loop_depth:
+                self._add(
+                    "to_datetime", node,
+                    f"`{source}` re-parses dates on every loop iteration",
+                    ROW_COST_S["to_datetime"] * LOOP_ITERATIONS_GUESS,
+                    "convert the column once before the loop",
+                )
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node):
+        # df[df.x == v] / df.loc[df['x'] == v] inside a loop: a full scan per iteration
+        if self.loop_depth:
+            target = node.value.value if isinstance(node.value, ast.Attribute) and node.value.attr == "loc" else node.value
+            name = target.id if isinstance(target, ast.Name) else None
+            if name and any(
+                isinstance(sub, ast.Compare) and _base_name(sub.left) == name
+                for sub in ast.walk(node.slice)
+            ):
+                self._add(
+                    "loop_filter", node,
+                    f"`{ast.unparse(node)}` scans the whole frame on every loop iteration",
+                    ROW_COST_S["loop_filter"] * LOOP_ITERATIONS_GUESS,
+                    f"group once (`{name}.groupby(...)`) and iterate over the groups",
+                )
+        self.generic_visit(node)
+
+
+def lint(code: str, n_rows: int | None = None) -> dict:
+    """
+    Static check of generated chart code for row-by-row pandas patterns:
+    iterrows/itertuples, apply(axis=1), boolean filtering of a frame inside a
+    loop, and pd.to_datetime repeated on the same column or inside a loop.
+
+    Each finding gets an `estimated_s` (per-row cost × `n_rows`).
+    Returns {"ok", "error", "findings", "estimated_s"}; "ok" is False only
+    when the code does not parse.
+    """
+    _STATS["checked"] += 1
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return {"ok": False, "error": f"SyntaxError: {e}", "findings": [], "estimated_s": 0.0}
+
+    visitor = _Visitor()
+    visitor.visit(tree)
+    visitor.flush_to_datetime()
+    for source, lines in visitor.repeated:
+        visitor.findings.append({
+            "rule": "to_datetime",
+            "line": lines[1],
+            "message": f"`{source}` is parsed {len(lines)} times (lines {', '.join(map(str, lines))})",
+            "per_row_s": ROW_COST_S["to_datetime"] * (len(lines) - 1),
+            "fix": "parse once and reuse the result",
+        })
+
+    for finding in visitor.findings:
+        finding["estimated_s"] = finding["per_row_s"] * (n_rows or 0)
+    visitor.findings.sort(key=lambda f: f["line"])
+    _STATS["findings"] += len(visitor.findings)
+    return {
+        "ok": True,
+        "error": None,
+        "findings": visitor.findings,
+        "estimated_s": sum(f["estimated_s"] for f in visitor.findings),
+    }
+
+
+class _HoistToDatetime(ast.NodeTransformer):
+    """Replace the given pd.to_datetime(...) call nodes with precomputed variables."""
+
+    def __init__(self, names: dict):
+        self.names = names  # id(call node) → variable name
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        name = self.names.get(id(node))
+        return ast.Name(id=name, ctx=ast.Load()) if name else node
+
+
+_SIMPLE_STATEMENTS = (ast.Expr, ast.Assign, ast.AugAssign, ast.AnnAssign)
+
+
+def _unconditional_nodes(stmt):
+    """
+    Nodes of a simple top-level statement that are evaluated every time it
+    runs: skips if/for/while/try/with blocks entirely, and inside
+    expressions the branches of `x if c else y`, all but the first operand
+    of and/or, comprehensions and lambdas.
+    """
+    if not isinstance(stmt, _SIMPLE_STATEMENTS):
+        return
+    stack = [stmt]
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            continue
+        if isinstance(node, ast.IfExp):
+            stack.append(node.test)
+        elif isinstance(node, ast.BoolOp):
+            stack.append(node.values[0])
+        else:
+            stack.extend(ast.iter_child_nodes(node))
+
+
+def _stored_columns(tree) -> set:
+    """Column keys assigned anywhere, e.g. {'date'} for df['date'] = ..."""
+    stored = set()
+    for node in ast.walk(tree):
+        targets = []
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, (ast.AugAssign, ast.AnnAssign)):
+            targets = [node.target]
+        for target in targets:
+            key = _column_key(target)
+            if key is not None:
+                stored.add(key)
+    return stored
+
+
+def _touches(stmt, frame: str, skip: set) -> bool:
+    """Whether `stmt` uses the name `frame` outside the call nodes in `skip` (ids)."""
+    stack = [stmt]
+    while stack:
+        node = stack.pop()
+        if id(node) in skip:
+            continue
+        if isinstance(node, ast.Name) and node.id == frame:
+            return True
+        stack.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def autofix(code: str) -> tuple[str, list[str]]:
+    """
+    Rewrite the patterns that have a safe mechanical fix:
+      - the same pd.to_datetime(df['col']) evaluated more than once in
+        unconditional top-level statements, when neither `df` nor 'col' is
+        reassigned and nothing between the first and last call uses `df`
+        (it could mutate it in place, e.g. dropna(inplace=True)), is hoisted
+        into one variable (calls under if/for/try or in a conditional
+        expression are left alone: hoisting them could parse a column the
+        original code never touches)
+    Returns (code, descriptions of the rewrites applied); the code is only
+    re-rendered (dropping comments) when something was rewritten.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code, []
+
+    stored = _stored_columns(tree)
+    rebound = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+    # First and last top-level statement using each call, and its call nodes
+    first_stmt, last_stmt, calls = {}, {}, {}
+    for index, stmt in enumerate(tree.body):
+        for node in _unconditional_nodes(stmt):
+            if not (
+                _is_to_datetime(node) and len(node.args) == 1
+                and all(kw.arg in ("format", "errors", "dayfirst") for kw in node.keywords)
+            ):
+                continue
+            key = _column_key(node.args[0])
+            if key is None or key in stored or _base_name(node.args[0]) in rebound:
+                continue
+            source = ast.unparse(node)
+            first_stmt.setdefault(source, index)
+            last_stmt[source] = index
+            calls.setdefault(source, []).append(node)
+
+    def untouched(source: str) -> bool:
+        frame = _base_name(calls[source][0].args[0])
+        skip = {id(node) for node in calls[source]}
+        body = tree.body[first_stmt[source] : last_stmt[source] + 1]
+        return not any(_touches(stmt, frame, skip) for stmt in body)
+
+    repeated = [source for source, nodes in calls.items() if len(nodes) > 1 and untouched(source)]
+    if not repeated:
+        return code, []
+
+    names = {source: f"_parsed_dates_{i}" for i, source in enumerate(repeated)}
+    hoist = _HoistToDatetime({id(node): names[source] for source in repeated for node in calls[source]})
+    tree = hoist.visit(tree)
+    # Insert the assignments, last first so earlier indices stay valid
+    for source in sorted(repeated, key=lambda s: first_stmt[s], reverse=True):
+        assign = ast.parse(f"{names[source]} = {source}").body[0]
+        tree.body.insert(first_stmt[source], assign)
+    ast.fix_missing_locations(tree)
+
+    applied = [f"hoisted {len(calls[s])}× `{s}` into `{names[s]}`" for s in repeated]
+    _STATS["autofixed"] += len(applied)
+    return ast.unparse(tree), applied
+
+
+def format_feedback(findings: list[dict]) -> str:
+    """Findings as a short bullet list for a prompt."""
+    lines = []
+    for f in findings:
+        cost = f" (≈{f['estimated_s']:.2f}s on this dataset)" if f.get("estimated_s") else ""
+        lines.append(f"- line {f['line']}: {f['message']}{cost}; {f['fix']}.")
+    return "\n".join(lines)
+
+
+def check(code: str, n_rows: int | None = None) -> dict:
+    """
+    Lint, apply safe rewrites, then lint the rewritten code.
+    Returns {"code", "applied", "findings", "estimated_s", "feedback"}:
+    the code to run, what was rewritten, what is left and a prompt-ready
+    summary of it ("" when nothing is left).
+    """
+    fixed, applied = autofix(code)
+    report = lint(fixed, n_rows)
+    return {
+        "code": fixed,
+        "applied": applied,
+        "findings": report["findings"],
+        "estimated_s": report["estimated_s"],
+        "feedback": format_feedback(report["findings"]),
+    }
+
+
+def lint_stats() -> dict:
+    return dict(_STATS)
+
+
+class _MaskOutputPaths(ast.NodeTransformer):
+    """Replace image-file string constants, which differ between versions by design."""
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and node.value.lower().endswith((".png", ".jpg", ".jpeg", ".svg", ".pdf")):
+            return ast.copy_location(ast.Constant(value="<output>"), node)
+        return node
+
+
+def ast_equivalent(code_a: str, code_b: str) -> bool:
+    """
+    True when two versions only differ in formatting, comments or the output
+    file name (compared via ast.dump). Unparseable code is never equivalent.
+    """
+    try:
+        trees = [_MaskOutputPaths().visit(ast.parse(code)) for code in (code_a, code_b)]
+    except SyntaxError:
+        return False
+    return ast.dump(trees[0]) == ast.dump(trees[1])
@@ -0,0 +1,154 @@
+import json
+
+import numpy as np
+
+# Beyond these sizes a text spec stops being a faithful, compact description
+MAX_SERIES = 20
+MAX_POINTS = 50
+
+
+def _round(values, digits: int = 4) -> list:
+    out = []
+    for v in values:
+        try:
+            f = float(v)
+            out.append(None if np.isnan(f) else float(f"{f:.{digits}g}"))
+        except (TypeError, ValueError):
+            out.append(str(v))
+    return out
+
+
+def _sample(values, max_points: int) -> list:
+    """Evenly spaced sample (keeps first and last points)."""
+    values = list(values)
+    if len(values) <= max_points:
+        return values
+    idx = np.linspace(0, len(values) - 1, max_points).round().astype(int)
+    return [values[i] for i in idx]
+
+
+def _tick_labels(labels) -> list:
+    return [t.get_text() for t in labels if t.get_text()]
+
+
+def _axes_spec(ax, max_points: int) -> dict:
+    from matplotlib.colors import to_hex
+
+    spec = {
+        "title": ax.get_title(),
+        "xlabel": ax.get_xlabel(),
+        "ylabel": ax.get_ylabel(),
+        "xlim": _round(ax.get_xlim()),
+        "ylim": _round(ax.get_ylim()),
+        "xscale": ax.get_xscale(),
+        "yscale": ax.get_yscale(),
+        "xticklabels": _sample(_tick_labels(ax.get_xticklabels()), 30),
+        "yticklabels": _sample(_tick_labels(ax.get_yticklabels()), 30),
+        "legend": [],
+        "series": [],
+        "unsupported": [],
+    }
+    legend = ax.get_legend()
+    if legend is not None:
+        spec["legend"] = [t.get_text() for t in legend.get_texts()]
+
+    # Lines (plot / step / errorbar lines)
+    for line in ax.get_lines():
+        x, y = line.get_xdata(), line.get_ydata()
+        if len(x) == 0:
+            continue
+        spec["series"].append({
+            "kind": "line",
+            "label": "" if line.get_label().startswith("_") else line.get_label(),
+            "color": to_hex(line.get_color()),
+            "n_points": len(x),
+            "x": _round(_sample(x, max_points)),
+            "y": _round(_sample(y, max_points)),
+        })
+
+    # Bars (bar / barh / hist) come as containers of rectangles
+    bar_patches = set()
+    for container in ax.containers:
+        patches = getattr(container, "patches", None)
+        if not patches:
+            continue
+        bar_patches.update(map(id, patches))
+        horizontal = getattr(container, "orientation", "vertical") == "horizontal"
+        values = [p.get_width() if horizontal else p.get_height() for p in patches]
+        positions = [p.get_y() + p.get_height() / 2 if horizontal else p.get_x() + p.get_width() / 2 for p in patches]
+        label = container.get_label() or ""
+        spec["series"].append({
+            "kind": "barh" if horizontal else "bar",
+            "label": "" if label.startswith("_") else label,
+            "color": to_hex(patches[0].get_facecolor()),
+            "n_points": len(patches),
+            "positions": _round(_sample(positions, max_points)),
+            "values": _round(_sample(values, max_points)),
+        })
+
+    # Scatter plots
+    for coll in ax.collections:
+        offsets = coll.get_offsets()
+        if type(coll).__name__ == "PathCollection" and len(offsets):
+            spec["series"].append({
+                "kind": "scatter",
+                "label": "" if coll.get_label().startswith("_") else coll.get_label(),
+                "n_points": len(offsets),
+                "x": _round(_sample(offsets[:, 0], max_points)),
+                "y": _round(_sample(offsets[:, 1], max_points)),
+            })
+        elif type(coll).__name__ != "PathCollection":
+            spec["unsupported"].append(type(coll).__name__)
+
+    # Anything drawn that we can't describe as data (pies, images, shapes)
+    for patch in ax.patches:
+        if id(patch) not in bar_patches:
+            spec["unsupported"].append(type(patch).__name__)
+    if ax.images:
+        spec["unsupported"].append("AxesImage")
+    if ax.name != "rectilinear":
+        spec["unsupported"].append(f"{ax.name} projection")
+    spec["unsupported"] = sorted(set(spec["unsupported"]))
+    return spec
+
+
+def extract_figure_spec(fig, max_points: int = MAX_POINTS) -> dict:
+    """
+    Compact, JSON-able description of a rendered matplotlib Figure:
+    titles, axis labels/limits, tick labels, legend entries and the data
+    of each plotted series (sampled to `max_points`).
+    """
+    suptitle = fig._suptitle.get_text() if getattr(fig, "_suptitle", None) else ""
+    width, height = fig.get_size_inches()
+    # Colorbars are axes too; they are described by their parent's mappable
+    axes = [ax for ax in fig.axes if not hasattr(ax, "_colorbar")]
+    return {
+        "suptitle": suptitle,
+        "size_inches": _round([width, height], 3),
+        "axes": [_axes_spec(ax, max_points) for ax in axes],
+        "n_colorbars": len(fig.axes) - len(axes),
+    }
+
+
+def ambiguity(spec: dict | None) -> str | None:
+    """
+    Reason the spec can't stand in for the image, or None if it can.
+    Ambiguous specs send the reflection down the vision path.
+    """
+    if not spec or "error" in spec or not spec.get("axes"):
+        return "no axes captured"
+    if spec.get("n_colorbars"):
+        return "colorbar / colour-mapped data"
+    for ax in spec["axes"]:
+        if ax["unsupported"]:
+            return "unsupported artists: " + ", ".join(ax["unsupported"])
+    n_series = sum(len(ax["series"]) for ax in spec["axes"])
+    if n_series == 0:
+        return "no plotted data found"
+    if n_series > MAX_SERIES:
+        return f"{n_series} series"
+    return None
+
+
+def to_json(spec: dict) -> str:
+    return json.dumps(spec, separators=(",", ":"), ensure_ascii=False)
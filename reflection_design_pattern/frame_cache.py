@@ -0,0 +1,164 @@
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+import utils
+import shared_frame
+
+CACHE_DIR = ".frame_cache"
+
+# Low-cardinality text columns stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ["coffee_name", "cash_type", "card"]
+# Small integer columns derived by load_and_prepare_data
+DOWNCAST_COLUMNS = {"quarter": "int8", "month": "int8", "year": "int16"}
+
+# Pre-aggregated cubes of `price`: name -> group-by dimensions
+CUBE_MEASURE = "price"
+CUBES = {
+    "by_year_quarter_month_coffee_cash": ["year", "quarter", "month", "coffee_name", "cash_type"],
+    "by_year_month_coffee": ["year", "month", "coffee_name"],
+    "by_year_quarter_coffee": ["year", "quarter", "coffee_name"],
+    "by_year_month": ["year", "month"],
+    "by_year_quarter": ["year", "quarter"],
+    "by_year_coffee": ["year", "coffee_name"],
+    "by_year_cash_type": ["year", "cash_type"],
+}
+
+
+def _file_sha1(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed, smaller version of the prepared frame."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col, dtype in DOWNCAST_COLUMNS.items():
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]) and not df[col].isna().any():
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def cached_frame(csv_path: str, cache_dir: str = CACHE_DIR) -> shared_frame.SharedFrame:
+    """
+    Columnar cache for utils.load_and_prepare_data(csv_path).
+
+    The prepared frame is stored as an uncompressed Feather file next to a
+    small JSON stamp of the CSV (size, mtime, sha1):
+      - size + mtime unchanged → cache hit without reading the CSV
+      - size/mtime changed but same sha1 → hit, stamp refreshed
+      - otherwise the CSV is re-parsed and the cache rewritten
+    Returns a SharedFrame handle; the same file can be handed to chart workers.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    key = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:12]
+    data_path = os.path.join(cache_dir, f"{base}_{key}.feather")
+    stamp_path = data_path + ".json"
+
+    st = os.stat(csv_path)
+    stamp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    try:
+        with open(stamp_path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = None
+
+    if cached is not None and os.path.exists(data_path):
+        if cached["size"] == stamp["size"] and cached["mtime_ns"] == stamp["mtime_ns"]:
+            return shared_frame.SharedFrame(data_path)
+        stamp["sha1"] = _file_sha1(csv_path)
+        if cached.get("sha1") == stamp["sha1"]:
+            with open(stamp_path, "w") as f:
+                json.dump(stamp, f)
+            return shared_frame.SharedFrame(data_path)
+
+    # Miss: parse the CSV once and store the typed columnar version
+    stamp.setdefault("sha1", _file_sha1(csv_path))
+    df = _compact(utils.load_and_prepare_data(csv_path))
+    shared_frame.publish_frame(df, path=data_path)
+    with open(stamp_path, "w") as f:
+        json.dump(stamp, f)
+    return shared_frame.SharedFrame(data_path)
+
+
+def dataset_fingerprint(csv_path: str, cache_dir: str = CACHE_DIR) -> str:
+    """Content hash (sha1) of the CSV, taken from the cache stamp when it is current."""
+    frame = cached_frame(csv_path, cache_dir)
+    try:
+        with open(frame.path + ".json") as f:
+            return json.load(f)["sha1"]
+    except (OSError, ValueError, KeyError):
+        return _file_sha1(csv_path)
+
+
+def available_cubes(columns) -> list[str]:
+    """Names of the CUBES groupings whose columns (and CUBE_MEASURE) are all in `columns`."""
+    columns = set(columns)
+    return [name for name, dims in CUBES.items() if set(dims) | {CUBE_MEASURE} <= columns]
+
+
+def build_cubes(df: pd.DataFrame) -> dict:
+    """
+    Sum / count / mean of CUBE_MEASURE for every grouping in CUBES
+    (skipping groupings whose columns are missing). Each cube is a flat
+    frame: the dimension columns, then price_sum, price_count, price_mean.
+    """
+    cubes = {}
+    for name in available_cubes(df.columns):
+        dims = CUBES[name]
+        grouped = df.groupby(dims, observed=True, sort=True)[CUBE_MEASURE]
+        cube = grouped.agg(["sum", "count", "mean"]).reset_index()
+        cubes[name] = cube.rename(columns={agg: f"{CUBE_MEASURE}_{agg}" for agg in ("sum", "count", "mean")})
+    return cubes
+
+
+def cached_cubes(csv_path: str, cache_dir: str = CACHE_DIR) -> dict:
+    """
+    Feather-cached build_cubes() of the prepared frame, as {name: SharedFrame}.
+    Cubes are rebuilt whenever the cached frame itself was rewritten.
+    """
+    frame = cached_frame(csv_path, cache_dir)
+    frame_mtime = os.stat(frame.path).st_mtime_ns
+    df = frame.attach()
+    # Only groupings this frame can build; the others would never be fresh
+    paths = {
+        name: f"{os.path.splitext(frame.path)[0]}.cube_{name}.feather"
+        for name in available_cubes(df.columns)
+    }
+
+    def fresh(path):
+        return os.path.exists(path) and os.stat(path).st_mtime_ns >= frame_mtime
+
+    if not all(fresh(path) for path in paths.values()):
+        for name, cube in build_cubes(df).items():
+            shared_frame.publish_frame(cube, path=paths[name])
+    return {name: shared_frame.SharedFrame(path) for name, path in paths.items()}
+
+
+def describe_cubes(cubes: dict) -> str:
+    """Prompt snippet listing each cube's columns and row count."""
+    lines = []
+    for name, handle in cubes.items():
+        cube = handle.attach() if isinstance(handle, shared_frame.SharedFrame) else handle
+        lines.append(f"- cubes['{name}'] ({len(cube)} rows): {', '.join(map(str, cube.columns))}")
+    return "\n".join(lines)
+
+
+def load_and_prepare_data_cached(csv_path: str, cache_dir: str = CACHE_DIR, with_cubes: bool = False):
+    """
+    Drop-in for utils.load_and_prepare_data backed by the memory-mapped cache.
+    With `with_cubes`, returns (df, {name: cube DataFrame}) instead.
+    """
+    df = cached_frame(csv_path, cache_dir).attach()
+    if not with_cubes:
+        return df
+    return df, {name: handle.attach() for name, handle in cached_cubes(csv_path, cache_dir).items()}
@@ -0,0 +1,177 @@
+import io
+import math
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# (image sha1, params) -> prepared payload, most recently used last
+_CACHE = OrderedDict()
+_CACHE_MAX_ENTRIES = 256
+_LOCK = threading.Lock()
+_STATS = {"images": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0, "tokens_in": 0, "tokens_out": 0}
+
+
+def estimate_image_tokens(width: int, height: int, provider: str = "openai") -> int:
+    """
+    Rough vision-token cost of an image.
+      openai:    fit in 2048², shortest side → 768, 85 + 170 per 512px tile
+      anthropic: long edge capped at 1568, ≈ width * height / 750
+    """
+    if provider == "anthropic":
+        scale = min(1.0, 1568 / max(width, height))
+        return math.ceil(width * scale * height * scale / 750)
+
+    scale = min(1.0, 2048 / max(width, height))
+    w, h = width * scale, height * scale
+    scale = min(1.0, 768 / min(w, h))
+    w, h = w * scale, h * scale
+    return 85 + 170 * math.ceil(w / 512) * math.ceil(h / 512)
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Drop alpha onto white; charts are saved with an opaque background anyway."""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.split()[-1])
+        return background
+    return img.convert("RGB")
+
+
+def _encode(img: Image.Image, fmt: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        # 256-colour palette: charts have few colours, so this is near-lossless
+        img.quantize(colors=256, method=Image.Quantize.MEDIANCUT).save(buf, "PNG", optimize=True)
+    elif fmt == "WEBP":
+        img.save(buf, "WEBP", quality=quality, method=6)
+    else:
+        img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def prepare_image(
+    path: str,
+    provider: str = "openai",
+    max_side: int = 1024,
+    byte_budget: int = 300_000,
+    formats: tuple = ("PNG", "WEBP", "JPEG"),
+) -> dict:
+    """
+    Resample a chart for a vision call and encode it under `byte_budget`.
+
+    1) downscale so the longest side is at most `max_side`
+    2) try each format in order (palette PNG, then WebP/JPEG at decreasing
+       quality) and keep the first that fits the budget
+    3) if none fits, shrink by 20% and try again
+
+    Results are cached by image content hash. Returns a dict with
+    media_type, b64 and the before/after byte and token estimates.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    key = (hashlib.sha1(raw).hexdigest(), provider, max_side, byte_budget, formats)
+
+    with _LOCK:
+        _STATS["images"] += 1
+        hit = _CACHE.get(key)
+        if hit is not None:
+            _CACHE.move_to_end(key)
+            _STATS["cache_hits"] += 1
+    if hit is not None:
+        return hit
+
+    img = Image.open(io.BytesIO(raw))
+    orig_w, orig_h = img.size
+    img = _flatten(img)
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    payload, fmt = None, None
+    while payload is None:
+        for candidate in formats:
+            for quality in ((None,) if candidate == "PNG" else (85, 70, 55)):
+                data = _encode(img, candidate, quality)
+                if len(data) <= byte_budget:
+                    payload, fmt = data, candidate
+                    break
+            if payload is not None:
+                break
+        if payload is None:
+            if min(img.size) < 64:
+                payload, fmt = data, candidate  # give up shrinking; send the last attempt
+                break
+            img = img.resize((int(img.width * 0.8), int(img.height * 0.8)), Image.Resampling.LANCZOS)
+
+    result = {
+        "media_type": f"image/{fmt.lower()}",
+        "b64": base64.b64encode(payload).decode("ascii"),
+        "size": img.size,
+        "bytes_in": len(raw),
+        "bytes_out": len(payload),
+        "tokens_in": estimate_image_tokens(orig_w, orig_h, provider),
+        "tokens_out": estimate_image_tokens(img.width, img.height, provider),
+    }
+    with _LOCK:
+        for name in ("bytes_in", "bytes_out", "tokens_in", "tokens_out"):
+            _STATS[name] += result[name]
+        _CACHE[key] = result
+        while len(_CACHE) > _CACHE_MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+    return result
+
+
+def stats() -> dict:
+    """Totals over freshly prepared images (cache hits are counted separately)."""
+    with _LOCK:
+        out = dict(_STATS)
+    out["bytes_saved"] = out["bytes_in"] - out["bytes_out"]
+    out["tokens_saved"] = out["tokens_in"] - out["tokens_out"]
+    return out
+
+
+def _gray(path: str, size: int) -> np.ndarray:
+    with Image.open(path) as img:
+        small = _flatten(img).convert("L").resize((size, size), Image.Resampling.LANCZOS)
+    return np.asarray(small, dtype=np.float64)
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def perceptual_hash(path: str, hash_size: int = 8, sample_size: int = 32) -> int:
+    """
+    pHash: DCT of a `sample_size`² grayscale thumbnail, low-frequency
+    `hash_size`² block thresholded at its median → `hash_size`² bit integer.
+    """
+    dct = _dct_matrix(sample_size)
+    coeffs = dct @ _gray(path, sample_size) @ dct.T
+    low = coeffs[:hash_size, :hash_size].flatten()
+    bits = low > np.median(low[1:])  # the DC term would dominate the median
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def image_distance(path_a: str, path_b: str, size: int = 64) -> dict:
+    """
+    How different two renders look:
+      hash_distance: Hamming distance between perceptual hashes (0–64)
+      pixel_diff:    mean absolute difference of `size`² grayscale thumbnails (0–1)
+    """
+    return {
+        "hash_distance": bin(perceptual_hash(path_a) ^ perceptual_hash(path_b)).count("1"),
+        "pixel_diff": float(np.abs(_gray(path_a, size) - _gray(path_b, size)).mean() / 255),
+    }
+
+
+def images_converged(distance: dict, max_hash_distance: int = 2, max_pixel_diff: float = 0.01) -> bool:
+    """True when both measures of an image_distance() result say the renders are near-identical."""
+    return distance["hash_distance"] <= max_hash_distance and distance["pixel_diff"] <= max_pixel_diff
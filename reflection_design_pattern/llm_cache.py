@@ -0,0 +1,232 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from types import SimpleNamespace
+
+
+def make_key(payload: dict) -> str:
+    """
+    Hash a JSON-able payload (prompt, model, sampling params, ...) into a
+    stable cache key.
+    """
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Small disk-backed key/value store on top of SQLite.
+
+    - LRU eviction once the stored values exceed `max_bytes` or `max_entries`
+    - entries older than `ttl_seconds` are treated as misses and dropped
+    - hit/miss counters for reporting
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = ".llm_cache.sqlite",
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache(last_access)")
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return bytes(value)
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # Drop expired entries first, then least recently used until under budget
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total, count = self._conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache").fetchone()
+        rows = self._conn.execute("SELECT key, size FROM cache ORDER BY last_access ASC")
+        doomed = []
+        for key, size in rows:
+            over_bytes = total > self.max_bytes
+            over_count = self.max_entries is not None and count > self.max_entries
+            if not (over_bytes or over_count):
+                break
+            doomed.append((key,))
+            total -= size
+            count -= 1
+        if doomed:
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total, count = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+def _cached_response(content: str):
+    """Minimal stand-in for a ChatCompletion: only what the workflows read."""
+    message = SimpleNamespace(role="assistant", content=content, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], cached=True)
+
+
+class CachedClient:
+    """
+    Wrap an aisuite / OpenAI client so `client.chat.completions.create(...)`
+    is served from a DiskCache when the call is deterministic.
+
+    Only temperature=0 calls without tools or streaming are cached; everything
+    else is passed straight through to the wrapped client.
+    """
+
+    def __init__(self, client, cache: DiskCache | None = None):
+        self._client = client
+        self.cache = cache if cache is not None else DiskCache()
+        self.bypassed = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    @staticmethod
+    def _cacheable(kwargs: dict) -> bool:
+        return (
+            kwargs.get("temperature") == 0
+            and not kwargs.get("tools")
+            and not kwargs.get("stream")
+        )
+
+    def _create(self, **kwargs):
+        if not self._cacheable(kwargs):
+            self.bypassed += 1
+            return self._client.chat.completions.create(**kwargs)
+
+        # Key on everything that can change the answer: model, prompt and params
+        key = make_key(kwargs)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return _cached_response(json.loads(hit)["content"])
+
+        response = self._client.chat.completions.create(**kwargs)
+        content = response.choices[0].message.content
+        if content is not None:
+            self.cache.set(key, json.dumps({"content": content}).encode("utf-8"))
+        return response
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "bypassed": self.bypassed}
+
+
+class RateLimiter:
+    """
+    Spaces calls to at most `requests_per_minute` (0 = unlimited).
+    Blocking and safe to share between threads.
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """
+    Wrap a client so `client.chat.completions.create(model=...)` waits for
+    that model's RateLimiter first. Provider limits are per account, so one
+    instance is shared by every caller in the process (threads included).
+    Put it under CachedClient so cache hits are never throttled.
+    """
+
+    def __init__(self, client, requests_per_minute: dict | None = None):
+        self._client = client
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self.set_rate_limits(requests_per_minute or {})
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def set_rate_limits(self, requests_per_minute: dict) -> None:
+        """Set model name → requests per minute (0 = unlimited); other models keep theirs."""
+        with self._lock:
+            for model, rpm in requests_per_minute.items():
+                self._limiters[model] = RateLimiter(rpm)
+
+    def _create(self, **kwargs):
+        with self._lock:
+            limiter = self._limiters.get(kwargs.get("model"))
+        if limiter is not None:
+            limiter.acquire()
+        return self._client.chat.completions.create(**kwargs)
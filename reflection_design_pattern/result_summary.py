@@ -0,0 +1,109 @@
+import pandas as pd
+
+# Rough prompt-size estimate; good enough to keep prompts bounded
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _clip_cells(df: pd.DataFrame, max_cell_chars: int) -> pd.DataFrame:
+    """Shorten long text cells so one wide value can't eat the budget."""
+    out = df.copy()
+    # Positional access: joins often repeat a column name (a.id, b.id)
+    for i in range(out.shape[1]):
+        values = out.iloc[:, i]
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            text = values.astype(str)
+            too_long = text.str.len() > max_cell_chars
+            if too_long.any():
+                out.isetitem(i, text.where(~too_long, text.str.slice(0, max_cell_chars) + "…"))
+    return out
+
+
+def column_stats(df: pd.DataFrame, top_k: int = 3) -> pd.DataFrame:
+    """
+    One row per column: dtype, nulls, distinct count and either
+    min/mean/max (numeric) or the most frequent values (everything else).
+    """
+    rows = []
+    # Positional access: joins often repeat a column name (a.id, b.id)
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i]
+        row = {
+            "column": col,
+            "dtype": str(values.dtype),
+            "nulls": int(values.isna().sum()),
+        }
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            row["summary"] = f"min={values.min():.4g}, mean={values.mean():.4g}, max={values.max():.4g}"
+        else:
+            counts = values.astype(str).value_counts()
+            top = ", ".join(f"{v!r}×{n}" for v, n in counts.head(top_k).items())
+            row["summary"] = f"distinct={len(counts)}, top: {top}"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_result(
+    df: pd.DataFrame,
+    max_rows: int = 20,
+    token_budget: int = 1500,
+    max_cell_chars: int = 80,
+) -> str:
+    """
+    Render a SQL result for a reflection prompt without letting it grow with
+    the result size.
+
+    Small results (≤ max_rows and within budget) are rendered in full, exactly
+    like df.to_markdown(index=False). Larger ones become:
+      - row / column counts
+      - head and tail samples with a truncation marker between them
+      - per-column stats
+    The sample is shrunk until the text fits `token_budget`.
+    """
+    n_rows, n_cols = df.shape
+    # Set by sql_engine.execute_sql when the fetch itself was capped
+    capped = df.attrs.get("limit")
+    capped_note = f"[result capped at {capped}; more rows exist]" if capped else ""
+
+    if n_rows <= max_rows:
+        full = _clip_cells(df, max_cell_chars).to_markdown(index=False)
+        if capped_note:
+            full += "\n" + capped_note
+        if estimate_tokens(full) <= token_budget:
+            return full
+
+    stats = column_stats(df).to_markdown(index=False)
+    sample_rows = min(max_rows, n_rows)
+
+    while True:
+        head_n = (sample_rows + 1) // 2
+        tail_n = sample_rows - head_n
+        head = _clip_cells(df.head(head_n), max_cell_chars)
+        omitted = n_rows - head_n - tail_n
+
+        parts = [f"Rows: {n_rows}, Columns: {n_cols}"]
+        if capped_note:
+            parts.append(capped_note)
+        if omitted > 0:
+            parts.append(f"Showing first {head_n} and last {tail_n} rows.")
+        parts.append(head.to_markdown(index=False))
+        if omitted > 0:
+            parts.append(f"... [truncated {omitted} rows] ...")
+        if tail_n:
+            parts.append(_clip_cells(df.tail(tail_n), max_cell_chars).to_markdown(index=False))
+        parts.append("Column stats:")
+        parts.append(stats)
+        text = "\n".join(parts)
+
+        if estimate_tokens(text) <= token_budget or sample_rows <= 1:
+            break
+        sample_rows //= 2
+
+    # Last resort for very wide results: hard cut at the budget
+    max_chars = token_budget * CHARS_PER_TOKEN
+    if len(text) > max_chars:
+        text = text[:max_chars] + "\n... [truncated to token budget] ..."
+    return text
@@ -0,0 +1,187 @@
+import os
+import re
+import math
+import threading
+from collections import Counter
+
+import sql_schema
+
+# db abs path -> (cached tables dict it was built from, SchemaIndex)
+_INDEX_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-case word tokens; splits snake_case and camelCase and strips a
+    trailing plural "s" so "colors" matches the column "color".
+    """
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    tokens = []
+    for tok in re.split(r"[^0-9a-zA-Z]+", text.lower()):
+        if not tok:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+class BM25:
+    """Plain Okapi BM25 over pre-tokenized documents."""
+
+    def __init__(self, docs: list[list[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_tf = [Counter(doc) for doc in docs]
+        self.doc_len = [len(doc) for doc in docs]
+        self.avg_len = sum(self.doc_len) / len(docs) if docs else 0.0
+        df = Counter(tok for doc in self.doc_tf for tok in doc)
+        n = len(docs)
+        self.idf = {tok: math.log(1 + (n - f + 0.5) / (f + 0.5)) for tok, f in df.items()}
+
+    def scores(self, query: list[str]) -> list[float]:
+        out = []
+        for tf, length in zip(self.doc_tf, self.doc_len):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_len or 1))
+            for tok in query:
+                f = tf.get(tok)
+                if f:
+                    score += self.idf[tok] * f * (self.k1 + 1) / (f + norm)
+            out.append(score)
+        return out
+
+
+class SchemaIndex:
+    """
+    Offline lexical index over one SQLite database: table names, column
+    names/types and a few distinct sample values per text column.
+    """
+
+    def __init__(self, db_path: str, samples_per_column: int = 5):
+        self.db_path = db_path
+        self.tables = sql_schema.get_schema_tables(db_path)
+        self.samples = self._sample_values(samples_per_column)
+
+        self.table_names = list(self.tables)
+        self.column_tokens = {}
+        docs = []
+        for table in self.table_names:
+            doc = tokenize(table) * 2
+            for col, col_type in self.tables[table]:
+                col_doc = tokenize(col) + tokenize(col_type)
+                for value in self.samples.get((table, col), []):
+                    col_doc += tokenize(value)
+                self.column_tokens[(table, col)] = set(col_doc)
+                doc += col_doc
+            docs.append(doc)
+        self.bm25 = BM25(docs)
+
+    def _sample_values(self, k: int) -> dict:
+        samples = {}
+        if k <= 0:
+            return samples
+        conn = sql_schema.connect_readonly(self.db_path)
+        try:
+            for table, columns in self.tables.items():
+                for col, col_type in columns:
+                    if "CHAR" not in col_type.upper() and "TEXT" not in col_type.upper():
+                        continue
+                    rows = conn.execute(
+                        f'SELECT DISTINCT "{col}" FROM "{table}" WHERE "{col}" IS NOT NULL LIMIT {int(k)}'
+                    ).fetchall()
+                    samples[(table, col)] = [str(r[0])[:50] for r in rows]
+        finally:
+            conn.close()
+        return samples
+
+    def select(
+        self,
+        question: str,
+        max_tables: int = 5,
+        max_columns_full: int = 15,
+    ) -> dict:
+        """
+        Return {table: [(column, type), ...]} relevant to `question`.
+
+        Tables are ranked with BM25; small tables keep all their columns,
+        wide ones keep key columns plus columns that share a token with the
+        question.
+        """
+        query = tokenize(question)
+        scores = self.bm25.scores(query)
+        ranked = sorted(
+            (i for i, s in enumerate(scores) if s > 0), key=lambda i: scores[i], reverse=True
+        )
+        picked = [self.table_names[i] for i in ranked[:max_tables]] or self.table_names[:max_tables]
+
+        query_set = set(query)
+        selected = {}
+        for table in picked:
+            columns = self.tables[table]
+            if len(columns) <= max_columns_full:
+                selected[table] = columns
+                continue
+            keep = [
+                (col, col_type)
+                for col, col_type in columns
+                if col.lower() == "id"
+                or col.lower().endswith("_id")
+                or query_set & self.column_tokens[(table, col)]
+            ]
+            selected[table] = keep or columns[:max_columns_full]
+        return selected
+
+
+def render_schema(tables: dict) -> str:
+    """Render {table: [(column, type)]} in the same layout as utils.get_schema."""
+    blocks = []
+    for table, columns in tables.items():
+        lines = [f"Table name: {table}"]
+        lines += [f"{col} ({col_type})" for col, col_type in columns]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def get_schema_index(db_path: str) -> SchemaIndex:
+    """
+    SchemaIndex for `db_path`, rebuilt only when sql_schema sees a new schema
+    version (sample values may lag behind data-only changes).
+    """
+    key = os.path.abspath(db_path)
+    tables = sql_schema.get_schema_tables(db_path)
+    with _LOCK:
+        cached = _INDEX_CACHE.get(key)
+    if cached is not None and cached[0] is tables:
+        return cached[1]
+    index = SchemaIndex(db_path)
+    with _LOCK:
+        _INDEX_CACHE[key] = (tables, index)
+    return index
+
+
+def warm_schema_index(db_path: str, min_tables_to_prune: int = 4) -> None:
+    """Build the cached schema (and the index, if prune_schema will use it) up front."""
+    tables = sql_schema.get_schema_tables(db_path)
+    sql_schema.get_schema_cached(db_path)
+    if len(tables) >= min_tables_to_prune:
+        get_schema_index(db_path)
+
+
+def prune_schema(
+    db_path: str,
+    question: str,
+    max_tables: int = 5,
+    min_tables_to_prune: int = 4,
+) -> str:
+    """
+    Schema text for the prompt, limited to tables/columns relevant to `question`.
+    Databases with fewer than `min_tables_to_prune` tables get the full
+    cached schema unchanged.
+    """
+    tables = sql_schema.get_schema_tables(db_path)
+    if len(tables) < min_tables_to_prune:
+        return sql_schema.get_schema_cached(db_path)
+    index = get_schema_index(db_path)
+    return render_schema(index.select(question, max_tables=max_tables))
@@ -0,0 +1,82 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+import pandas as pd
+
+# Worker-side cache: path -> (mtime_ns, DataFrame attached from that file)
+_ATTACHED = {}
+_LOCK = threading.Lock()
+
+SHARED_DIR = os.path.join(tempfile.gettempdir(), "agentic_shared_frames")
+
+
+class SharedFrame:
+    """
+    Picklable handle to a DataFrame published as an uncompressed Feather
+    (Arrow IPC) file. Only the path crosses the process boundary; workers
+    memory-map the file and keep the attached frame across jobs.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __repr__(self):
+        return f"SharedFrame({self.path!r})"
+
+    def attach(self) -> pd.DataFrame:
+        return attach_frame(self.path)
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Cheap content hash (vectorized) used to name published files."""
+    rows = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    columns = "|".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items())
+    return hashlib.sha1(rows.tobytes() + columns.encode("utf-8")).hexdigest()[:24]
+
+
+def publish_frame(df: pd.DataFrame, path: str | None = None) -> SharedFrame:
+    """
+    Write `df` once as an uncompressed Feather file (so it can be
+    memory-mapped without decoding) and return a handle to it.
+    Publishing the same content again reuses the existing file.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if path is None:
+        os.makedirs(SHARED_DIR, exist_ok=True)
+        path = os.path.join(SHARED_DIR, f"frame_{frame_digest(df)}.feather")
+        if os.path.exists(path):
+            return SharedFrame(path)
+
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, path)  # atomic: readers never see a half-written file
+    return SharedFrame(path)
+
+
+def attach_frame(path: str) -> pd.DataFrame:
+    """
+    Memory-map a published Feather file as a DataFrame.
+
+    Numeric columns without nulls point straight at the mapped pages
+    (split_blocks avoids consolidating them into a copy); the result is
+    cached per process until the file changes. Callers get a shallow copy,
+    so column assignments in one job don't leak into the next.
+    """
+    import pyarrow as pa
+
+    mtime = os.stat(path).st_mtime_ns
+    with _LOCK:
+        cached = _ATTACHED.get(path)
+    if cached is None or cached[0] != mtime:
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        df = table.to_pandas(split_blocks=True)
+        cached = (mtime, df)
+        with _LOCK:
+            _ATTACHED[path] = cached
+    return cached[1].copy(deep=False)
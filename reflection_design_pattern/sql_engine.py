@@ -0,0 +1,357 @@
+import io
+import re
+import os
+import time
+import queue
+import pickle
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import sql_schema
+
+
+class QueryTimeout(Exception):
+    """The statement ran past its time budget and was interrupted."""
+
+
+class QueryLimitExceeded(Exception):
+    """The result crossed max_rows / max_bytes and on_limit="raise" was set."""
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the pool's acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Pool of read-only SQLite connections, one LIFO queue per database file.
+    Connections are created lazily up to `max_size` per file; when all of
+    them are busy, callers wait up to `acquire_timeout_s` for one.
+    """
+
+    def __init__(self, max_size: int = 8, acquire_timeout_s: float = 30.0):
+        self.max_size = max_size
+        self.acquire_timeout_s = acquire_timeout_s
+        self._idle = {}
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def _new_connection(self, db_path: str) -> sqlite3.Connection:
+        conn = sql_schema.connect_readonly(db_path)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self, db_path: str):
+        with self._lock:
+            idle = self._idle.setdefault(db_path, queue.LifoQueue())
+            can_create = idle.empty() and self._created.get(db_path, 0) < self.max_size
+            if can_create:
+                self._created[db_path] = self._created.get(db_path, 0) + 1
+
+        if can_create:
+            try:
+                conn = self._new_connection(db_path)
+            except BaseException:
+                # Give the slot back, or failed connects would use up the pool
+                with self._lock:
+                    self._created[db_path] -= 1
+                raise
+        else:
+            try:
+                conn = idle.get(timeout=self.acquire_timeout_s)
+            except queue.Empty:
+                raise PoolTimeout(
+                    f"No connection to {db_path} became free within {self.acquire_timeout_s}s"
+                ) from None
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+            idle.put(conn)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+            self._created.clear()
+
+
+_POOL = ConnectionPool()
+
+
+def _dumps_frame(df: pd.DataFrame) -> bytes:
+    # Parquet when pyarrow is around (compact, columnar), pickle otherwise
+    # (also for frames Parquet can't hold: duplicate column names, or SQLite
+    # columns mixing text and numbers, which pyarrow rejects with ArrowTypeError)
+    try:
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        return b"PQ" + buf.getvalue()
+    except (ImportError, ValueError, TypeError, NotImplementedError):
+        return b"PK" + pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _loads_frame(blob: bytes) -> pd.DataFrame:
+    if blob[:2] == b"PQ":
+        return pd.read_parquet(io.BytesIO(blob[2:]))
+    return pickle.loads(blob[2:])
+
+
+class ResultCache:
+    """
+    In-memory LRU of query results, bounded by the size of the stored
+    (Parquet-compressed) bytes. Keyed on the canonical SQL text plus the
+    database file fingerprint, so any write to the file invalidates it.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(sql: str, db_path: str, *limits) -> tuple:
+        return (
+            os.path.abspath(db_path),
+            sql_schema.file_fingerprint(db_path),
+            canonical_sql(sql),
+        ) + limits
+
+    def get(self, key: tuple) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        blob, attrs = entry
+        df = _loads_frame(blob)
+        df.attrs.update(attrs)
+        return df
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        blob = _dumps_frame(df)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (blob, dict(df.attrs))
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def _row_bytes(rows: list) -> int:
+    """Approximate in-memory size of fetched rows (payload only)."""
+    total = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            else:
+                total += 8
+    return total
+
+
+def execute_sql(
+    sql: str,
+    db_path: str,
+    max_rows: int = 100_000,
+    max_bytes: int = 64 * 1024 * 1024,
+    timeout_s: float = 10.0,
+    chunk_size: int = 1_000,
+    on_limit: str = "truncate",
+    pool: ConnectionPool | None = None,
+    cache: ResultCache | None = _RESULT_CACHE,
+) -> pd.DataFrame:
+    """
+    Run one SQL statement against `db_path` on a pooled read-only connection.
+
+    - rows are fetched in chunks of `chunk_size` (cursor.fetchmany)
+    - stops at `max_rows` rows or ~`max_bytes` of payload; by default the
+      partial result is returned with df.attrs["truncated"] = True,
+      on_limit="raise" raises QueryLimitExceeded instead
+    - a progress handler interrupts the statement after `timeout_s` seconds
+      (also while fetching) and raises QueryTimeout
+    - results are served from `cache` when an equivalent query (same
+      canonical_sql) already ran on the unchanged file; cache=None disables it
+    """
+    if cache is not None:
+        key = ResultCache.make_key(sql, db_path, max_rows, max_bytes, on_limit)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    pool = pool or _POOL
+    deadline = time.monotonic() + timeout_s
+
+    def check_deadline():
+        # Non-zero return value makes SQLite abort the running statement
+        return 1 if time.monotonic() > deadline else 0
+
+    with pool.connection(db_path) as conn:
+        conn.set_progress_handler(check_deadline, 10_000)
+        rows = []
+        n_bytes = 0
+        truncated = None
+        cursor = None
+        try:
+            cursor = conn.execute(sql)
+            columns = [d[0] for d in cursor.description or []]
+            while True:
+                # Read at most one row past max_rows: that row tells us more exist
+                chunk = cursor.fetchmany(min(chunk_size, max_rows + 1 - len(rows)))
+                if not chunk:
+                    break
+                rows.extend(chunk)
+                n_bytes += _row_bytes(chunk)
+                if len(rows) > max_rows:
+                    truncated = f"max_rows={max_rows}"
+                elif n_bytes >= max_bytes:
+                    truncated = f"max_bytes={max_bytes}"
+                if truncated:
+                    break
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise QueryTimeout(f"Query exceeded {timeout_s}s and was cancelled") from e
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    if truncated:
+        if on_limit == "raise":
+            raise QueryLimitExceeded(f"Query result exceeded {truncated}")
+        rows = rows[:max_rows]
+
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df.attrs["truncated"] = bool(truncated)
+    df.attrs["limit"] = truncated
+    if cache is not None:
+        cache.put(key, df)
+    return df
+
+
+def fingerprint_result(df: pd.DataFrame, float_digits: int = 6) -> str:
+    """
+    Order-insensitive fingerprint of a result set.
+
+    Column names, column order and row order are ignored; numbers are compared
+    as rounded floats and text with surrounding whitespace stripped, so two
+    queries that return the same answer with different aliases / ORDER BY
+    produce the same fingerprint.
+    """
+    if df.empty:
+        return hashlib.sha256(f"empty:{df.shape[1]}".encode()).hexdigest()
+
+    norm = pd.DataFrame(index=range(len(df)))
+    for i, col in enumerate(df.columns):
+        values = df.iloc[:, i].reset_index(drop=True)
+        if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            norm[i] = values.astype("float64").round(float_digits)
+        else:
+            norm[i] = values.astype(str).str.strip()
+
+    # Put columns in a content-defined order, then hash rows and sort them
+    col_keys = {
+        c: int(pd.util.hash_pandas_object(norm[c], index=False).sum() % (1 << 63))
+        for c in norm.columns
+    }
+    norm = norm[sorted(norm.columns, key=lambda c: col_keys[c])]
+    norm.columns = range(norm.shape[1])
+    row_hashes = np.sort(pd.util.hash_pandas_object(norm, index=False).to_numpy())
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+# Quoted text ('string', "identifier or string") and comments, in one pass so
+# a "--" inside a literal is not mistaken for a comment
+_LITERALS_AND_COMMENTS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)""", re.DOTALL)
+
+
+def _split_quoted(sql: str) -> list[str]:
+    """Split on quoted text: even items are SQL code, odd items quoted literals."""
+    return _LITERALS_AND_COMMENTS.split(sql)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical text form of a query for equality checks: comments, code
+    fences, trailing semicolons and whitespace differences removed, keywords
+    and identifiers lower-cased. Quoted text is left untouched, single- and
+    double-quoted alike: SQLite reads "red" as a string when no column of
+    that name exists, so its case can change the result.
+    """
+    sql = re.sub(r"^```(?:sql)?|```$", "", sql.strip(), flags=re.IGNORECASE).strip()
+
+    parts = _split_quoted(sql)
+    for i in range(1, len(parts), 2):
+        if parts[i].startswith(("--", "/*")):
+            parts[i] = " "
+    # Comments are now plain code; re-split so code and literals alternate
+    parts = _split_quoted("".join(parts))
+    for i in range(0, len(parts), 2):
+        text = re.sub(r"\s+", " ", parts[i].lower())
+        parts[i] = re.sub(r"\s*([(),=<>+*/-])\s*", r"\1", text)
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+_ALIAS_STOPWORDS = {
+    "where", "join", "on", "group", "order", "limit", "left", "right", "inner",
+    "outer", "cross", "natural", "using", "union", "having", "window", "except",
+    "intersect", "full",
+}
+
+
+def canonical_sql(sql: str) -> str:
+    """
+    normalize_sql plus renaming of table aliases to t1, t2, ... in order of
+    appearance, so `FROM transactions t` and `FROM transactions AS tx`
+    give the same key. Output column aliases are kept: they change the
+    result's column names.
+    """
+    parts = _split_quoted(normalize_sql(sql))
+    # Keep double-quoted names for alias detection (FROM "transactions" t),
+    # but only rename inside unquoted code
+    code = " ".join(p if i % 2 == 0 or p.startswith('"') else "''" for i, p in enumerate(parts))
+
+    aliases = {}
+    for m in re.finditer(r"\b(?:from|join)\s+(\"?[\w.]+\"?)\s+(?:as\s+)?([a-z_]\w*)", code):
+        alias = m.group(2)
+        if alias not in _ALIAS_STOPWORDS and alias not in aliases:
+            aliases[alias] = f"t{len(aliases) + 1}"
+    if not aliases:
+        return "".join(parts)
+
+    pattern = re.compile(r"\b(" + "|".join(map(re.escape, aliases)) + r")\b(?!\s*\()")
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\bas\s+(" + "|".join(map(re.escape, aliases)) + r")\b", r"\1", parts[i])
+        parts[i] = pattern.sub(lambda m: aliases[m.group(1)], parts[i])
+    return "".join(parts)
@@ -1,4 +1,10 @@
 import json
+import time
+import sqlite3
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 import utils
 import pandas as pd
 from dotenv import load_dotenv
@@ -9,12 +15,27 @@ _ = load_dotenv()
 #can find this module similar to openAI() package
 import aisuite as ai
 
-client = ai.Client()
+# Local disk cache for deterministic (temperature=0) completions
+import llm_cache
+# Schema memoized per database file / schema version
+import sql_schema
+# Question-relevant subset of the schema for large databases
+import schema_index
+# Bounded rendering of SQL results for reflection prompts
+import result_summary
+# Streaming, capped, read-only SQL execution
+import sql_engine
+# Local EXPLAIN-based validation and repair of generated SQL
+import sql_validation
+
+# Rate limits (set by the batch runner) sit under the cache, so hits aren't throttled
+rate_limited_client = llm_cache.RateLimitedClient(ai.Client())
+client = llm_cache.CachedClient(rate_limited_client, llm_cache.DiskCache(".llm_cache.sqlite"))
 
 utils.create_transactions_db()
-utils.print_html(utils.get_schema('products.db'))
+utils.print_html(sql_schema.get_schema_cached('products.db'))
 
-def generate_sql(question: str, schema: str, model: str) -> str:
+def generate_sql(question: str, schema: str, model: str, temperature: float = 0) -> str:
     prompt = f"""
     You are a SQL assistant. Given the schema and the user's question, write a SQL query for SQLite.
 
@@ -29,7 +50,7 @@ def generate_sql(question: str, schema: str, model: str) -> str:
     response = client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
-        temperature=0,
+        temperature=temperature,
     )
     return response.choices[0].message.content.strip()
 
@@ -123,10 +144,13 @@ def refine_sql_external_feedback(
     df_feedback: pd.DataFrame,
     schema: str,
     model: str,
+    feedback_token_budget: int = 1500,
 ) -> tuple[str, str]:
     """
     Evaluate whether the SQL result answers the user's question and,
     if necessary, propose a refined version of the query.
+    Large results are summarized (samples + column stats) so the
+    SQL output section stays within `feedback_token_budget` tokens.
     Returns (feedback, refined_sql).
     """
     prompt = f"""
@@ -139,7 +163,7 @@ def refine_sql_external_feedback(
     {sql_query}
 
     SQL Output:
-    {df_feedback.to_markdown(index=False)}
+    {result_summary.summarize_result(df_feedback, token_budget=feedback_token_budget)}
 
     Table Schema:
     {schema}
@@ -176,11 +200,36 @@ def refine_sql_external_feedback(
     return feedback, refined_sql
 
 
+def validate_and_execute(sql: str, db_path: str) -> tuple[str, pd.DataFrame, dict]:
+    """
+    Validate `sql` locally (EXPLAIN + cached schema, repairing trivial errors)
+    and execute it. If it still doesn't compile, or fails while running
+    (timeout, result cap with on_limit="raise", SQLite runtime error), the
+    error comes back as a one-row DataFrame so reflection can fix it, and
+    check["ok"] is False.
+    Returns (sql_to_use, df, check).
+    """
+    check = sql_validation.validate_sql(sql, db_path)
+    if not check["ok"]:
+        return check["sql"], pd.DataFrame({"error": [check["error"]]}), check
+    try:
+        df = sql_engine.execute_sql(check["sql"], db_path)
+    except (sql_engine.QueryTimeout, sql_engine.QueryLimitExceeded, sqlite3.Error) as e:
+        error = f"{type(e).__name__}: {e}"
+        return check["sql"], pd.DataFrame({"error": [error]}), {**check, "ok": False, "error": error}
+    return check["sql"], df, check
+
+
 def run_sql_workflow(
     db_path: str,
     question: str,
     model_generation: str = "openai:gpt-4.1",
     model_evaluation: str = "openai:gpt-4.1",
+    verbose: bool = True,
+    max_rounds: int = 1,
+    time_budget_s: float | None = None,
+    token_budget: int | None = None,
+    feedback_token_budget: int = 1500,
 ):
     """
     End-to-end workflow to generate, execute, evaluate, and refine SQL queries.
@@ -189,54 +238,307 @@ def run_sql_workflow(
       1) Extract database schema
       2) Generate SQL (V1)
       3) Execute V1 → show output
-      4) Reflect on V1 with execution feedback → propose refined SQL (V2)
-      5) Execute V2 → show final answer
+      4) Reflect on the latest SQL with execution feedback → propose refined SQL
+      5) Execute the refined SQL → repeat 4-5 up to `max_rounds` times
+
+    The reflection loop stops early when:
+      - the refined SQL normalizes to the previous one (not re-executed)
+      - the refined SQL returns the same result fingerprint
+      - `time_budget_s` seconds have passed, or the next round would exceed
+        `token_budget` estimated reflection prompt tokens
+
+    Set verbose=False to skip the per-step HTML output.
+    Returns a dict with all artifacts (queries, feedback, dataframes, rounds).
     """
+    show = utils.print_html if verbose else (lambda *args, **kwargs: None)
+    start = time.perf_counter()
 
-    # 1) Schema
-    schema = utils.get_schema(db_path)
-    utils.print_html(
+    # 1) Schema (pruned to the relevant tables/columns on large databases)
+    schema = schema_index.prune_schema(db_path, question)
+    show(
         schema,
         title="📘 Step 1 — Extract Database Schema"
     )
 
     # 2) Generate SQL (V1)
     sql_v1 = generate_sql(question, schema, model_generation)
-    utils.print_html(
+    show(
         sql_v1,
         title="🧠 Step 2 — Generate SQL (V1)"
     )
 
-    # 3) Execute V1
-    df_v1 = utils.execute_sql(sql_v1, db_path)
-    utils.print_html(
+    # 3) Validate locally, then execute V1
+    sql_v1, df_v1, check = validate_and_execute(sql_v1, db_path)
+    if check["repairs"] and check["ok"] and max_rounds > 1:
+        # Round 1 reviews the real result instead of fixing the error
+        sql_validation.record_llm_call_saved()
+    if check["repairs"]:
+        show(
+            f"{sql_v1}\n\nRepairs: {', '.join(check['repairs'])}",
+            title="🛠️ Step 3 — Repaired V1 locally"
+        )
+    show(
         df_v1,
         title="🧪 Step 3 — Execute V1 (SQL Output)"
     )
 
-    # 4) Reflect on V1 with execution feedback → refine to V2
+    sql_cur, df_cur = sql_v1, df_v1
+    fingerprint_cur = sql_engine.fingerprint_result(df_v1)
+    feedback = ""
+    rounds = []
+    tokens_used = 0
+    stop_reason = "max_rounds"
+
+    for round_no in range(1, max_rounds + 1):
+        # Budget checks before paying for another reflection call
+        if time_budget_s is not None and time.perf_counter() - start > time_budget_s:
+            stop_reason = "time_budget"
+            break
+        round_tokens = (
+            result_summary.estimate_tokens(question + sql_cur + schema) + feedback_token_budget
+        )
+        if token_budget is not None and tokens_used + round_tokens > token_budget:
+            stop_reason = "token_budget"
+            break
+        tokens_used += round_tokens
+
+        # 4) Reflect on the latest SQL with execution feedback → refine
+        feedback, sql_next = refine_sql_external_feedback(
+            question=question,
+            sql_query=sql_cur,
+            df_feedback=df_cur,          # external feedback: real output of the latest SQL
+            schema=schema,
+            model=model_evaluation,
+            feedback_token_budget=feedback_token_budget,
+        )
+        show(
+            feedback,
+            title=f"🧭 Step 4 — Reflect (round {round_no}, Feedback)"
+        )
+        show(
+            sql_next,
+            title=f"🔁 Step 4 — Refined SQL (V{round_no + 1})"
+        )
+        rounds.append({"round": round_no, "feedback": feedback, "sql": sql_next})
+
+        # Converged: same query → no need to execute it again
+        if sql_engine.canonical_sql(sql_next) == sql_engine.canonical_sql(sql_cur):
+            stop_reason = "sql_unchanged"
+            break
+
+        # 5) Execute the refined SQL
+        sql_next, df_next, check = validate_and_execute(sql_next, db_path)
+        if check["repairs"] and check["ok"] and round_no + 1 < max_rounds:
+            sql_validation.record_llm_call_saved()
+        fingerprint_next = sql_engine.fingerprint_result(df_next)
+        sql_cur, df_cur = sql_next, df_next
+
+        # Converged: different query, same answer
+        if fingerprint_next == fingerprint_cur:
+            stop_reason = "result_unchanged"
+            break
+        fingerprint_cur = fingerprint_next
+
+    show(
+        df_cur,
+        title=f"✅ Step 5 — Final Answer ({len(rounds)} round(s), stop: {stop_reason})"
+    )
+
+    return {
+        "question": question,
+        "sql_v1": sql_v1,
+        "df_v1": df_v1,
+        "feedback": feedback,
+        "sql_v2": sql_cur,
+        "df_v2": df_cur,
+        "rounds": rounds,
+        "stop_reason": stop_reason,
+    }
+
+
+def run_sql_self_consistency(
+    db_path: str,
+    question: str,
+    n_candidates: int = 5,
+    model_generation: str = "openai:gpt-4.1",
+    model_evaluation: str = "openai:gpt-4.1",
+    temperature: float = 0.7,
+    verbose: bool = True,
+):
+    """
+    Self-consistency alternative to run_sql_workflow.
+
+    Steps:
+      1) Extract database schema
+      2) Generate N candidate SQL queries in parallel
+         (candidate 0 at temperature 0, the rest at `temperature`)
+      3) Execute all candidates concurrently
+      4) Vote: group candidates by result fingerprint; a strict majority wins
+      5) No majority → reflect on the most common answer and execute the
+         refined SQL (same as steps 4-5 of run_sql_workflow)
+
+    Returns a dict with the chosen sql/df, the vote counts and whether
+    reflection was needed.
+    """
+    show = utils.print_html if verbose else (lambda *args, **kwargs: None)
+
+    # 1) Schema (pruned to the relevant tables/columns on large databases)
+    schema = schema_index.prune_schema(db_path, question)
+
+    def candidate(i: int) -> dict:
+        sql = generate_sql(question, schema, model_generation, temperature=0 if i == 0 else temperature)
+        try:
+            sql, df, check = validate_and_execute(sql, db_path)
+            if not check["ok"]:
+                # Invalid candidates don't vote
+                return {"sql": sql, "df": None, "fingerprint": None, "error": check["error"]}
+            return {"sql": sql, "df": df, "fingerprint": sql_engine.fingerprint_result(df), "error": None}
+        except Exception as e:
+            return {"sql": sql, "df": None, "fingerprint": None, "error": f"{type(e).__name__}: {e}"}
+
+    # 2) + 3) Generate and execute candidates in parallel
+    with ThreadPoolExecutor(max_workers=n_candidates) as pool:
+        candidates = list(pool.map(candidate, range(n_candidates)))
+    show(
+        pd.DataFrame([
+            {"sql": c["sql"], "fingerprint": (c["fingerprint"] or "")[:12], "error": c["error"]}
+            for c in candidates
+        ]),
+        title=f"🧠 Step 2-3 — {n_candidates} SQL Candidates"
+    )
+
+    # 4) Vote on result-set agreement
+    votes = {}
+    for c in candidates:
+        if c["fingerprint"] is not None:
+            votes.setdefault(c["fingerprint"], []).append(c)
+    ranked = sorted(votes.values(), key=len, reverse=True)
+
+    if ranked and len(ranked[0]) * 2 > n_candidates:
+        winner = ranked[0][0]
+        show(
+            winner["df"],
+            title=f"✅ Step 4 — Agreement {len(ranked[0])}/{n_candidates} (Final Answer)"
+        )
+        return {
+            "question": question,
+            "sql": winner["sql"],
+            "df": winner["df"],
+            "votes": [len(group) for group in ranked],
+            "used_reflection": False,
+            "candidates": candidates,
+        }
+
+    # 5) Candidates disagree → fall back to reflection on the best guess
+    best = ranked[0][0] if ranked else candidates[0]
+    df_best = best["df"] if best["df"] is not None else pd.DataFrame({"error": [best["error"]]})
     feedback, sql_v2 = refine_sql_external_feedback(
         question=question,
-        sql_query=sql_v1,
-        df_feedback=df_v1,          # external feedback: real output of V1
+        sql_query=best["sql"],
+        df_feedback=df_best,
         schema=schema,
         model=model_evaluation,
     )
-    utils.print_html(
-        feedback,
-        title="🧭 Step 4 — Reflect on V1 (Feedback)"
-    )
-    utils.print_html(
-        sql_v2,
-        title="🔁 Step 4 — Refined SQL (V2)"
+    sql_v2, df_v2, _ = validate_and_execute(sql_v2, db_path)
+    show(feedback, title="🧭 Step 5 — Candidates disagree, reflect (Feedback)")
+    show(df_v2, title="✅ Step 5 — Execute refined SQL (Final Answer)")
+
+    return {
+        "question": question,
+        "sql": sql_v2,
+        "df": df_v2,
+        "votes": [len(group) for group in ranked],
+        "used_reflection": True,
+        "feedback": feedback,
+        "candidates": candidates,
+    }
+
+
+async def run_sql_workflow_batch(
+    db_path: str,
+    questions: list[str],
+    model_generation: str = "openai:gpt-4.1",
+    model_evaluation: str = "openai:gpt-4.1",
+    max_concurrency: int = 16,
+    requests_per_minute: dict | None = None,
+    **workflow_kwargs,
+):
+    """
+    Run run_sql_workflow (verbose=False) over many questions against one database.
+
+    - at most `max_concurrency` questions in flight at once, each in a worker thread
+    - `requests_per_minute` maps model name → rate limit, applied to the shared
+      client (so it also holds across concurrent batches)
+    - `workflow_kwargs` go to run_sql_workflow (max_rounds, time_budget_s, ...)
+    - results are yielded as soon as each question finishes (not in input order);
+      every result carries its input "index" and an "error" (None on success)
+
+    Usage:
+        async for result in run_sql_workflow_batch("products.db", questions):
+            ...
+    """
+    rate_limited_client.set_rate_limits(requests_per_minute or {})
+    workflow = functools.partial(
+        run_sql_workflow,
+        model_generation=model_generation,
+        model_evaluation=model_evaluation,
+        verbose=False,
+        **workflow_kwargs,
     )
 
-    # 5) Execute V2
-    df_v2 = utils.execute_sql(sql_v2, db_path)
-    utils.print_html(
-        df_v2,
-        title="✅ Step 5 — Execute V2 (Final Answer)"
-    )
+    # Build the cached schema / index once, before the workers start
+    schema_index.warm_schema_index(db_path)
+
+    pending = asyncio.Queue()
+    for item in enumerate(questions):
+        pending.put_nowait(item)
+    finished = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, question = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(executor, workflow, db_path, question)
+                result["error"] = None
+            except Exception as e:
+                result = {"question": question, "error": f"{type(e).__name__}: {e}"}
+            result["index"] = index
+            result["elapsed"] = time.perf_counter() - start
+            await finished.put(result)
+
+    loop = asyncio.get_running_loop()
+    n_workers = max(1, min(max_concurrency, len(questions)))
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        workers = [asyncio.create_task(worker()) for _ in range(n_workers)]
+        try:
+            for _ in range(len(questions)):
+                yield await finished.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+def iter_sql_workflow_batch(db_path: str, questions: list[str], **kwargs):
+    """
+    Blocking generator version of run_sql_workflow_batch for non-async callers.
+    Yields results as they finish.
+    """
+    loop = asyncio.new_event_loop()
+    batch = run_sql_workflow_batch(db_path, questions, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(batch.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(batch.aclose())
+        loop.close()
 
 run_sql_workflow(
     "products.db", 
@@ -244,3 +546,16 @@ run_sql_workflow(
     model_generation="openai:gpt-4.1",
     model_evaluation="openai:gpt-4.1"
 )
+
+# Batch mode: many questions against one database, results streamed as they finish
+#questions = ["Which color of product has the highest total sales?", "How many products were returned?"]
+#for result in iter_sql_workflow_batch("products.db", questions, max_concurrency=8,
+#                                      requests_per_minute={"openai:gpt-4.1": 500}):
+#    print(result["index"], result["error"] or result["sql_v2"])
+
+# Hit/miss counters of the LLM response cache
+utils.print_html(client.stats(), title="LLM Cache Stats")
+# How many reflection calls local validation/repair saved
+utils.print_html(sql_validation.validation_stats(), title="SQL Validation Stats")
+# Hit/miss counters of the SQL result cache
+utils.print_html(sql_engine._RESULT_CACHE.stats(), title="SQL Result Cache Stats")
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+
+# abs db path -> {"fingerprint", "schema_version", "schema", "tables"}
+_SCHEMA_CACHE = {}
+_LOCK = threading.Lock()
+
+
+def connect_readonly(db_path: str) -> sqlite3.Connection:
+    """Open a read-only connection to an existing SQLite file."""
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+
+def file_fingerprint(db_path: str) -> tuple:
+    """
+    Identity + modification stamp of the database file (and its WAL, if any).
+    Cheap: two stat() calls, no SQLite connection.
+    """
+    st = os.stat(db_path)
+    fingerprint = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+    try:
+        wal = os.stat(db_path + "-wal")
+        fingerprint += (wal.st_size, wal.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return fingerprint
+
+
+def read_schema_version(db_path: str) -> int:
+    """SQLite bumps PRAGMA schema_version on every DDL change."""
+    conn = connect_readonly(db_path)
+    try:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _introspect_tables(db_path: str) -> dict:
+    """Return {table_name: [(column_name, column_type), ...]} for all user tables."""
+    conn = connect_readonly(db_path)
+    try:
+        names = [
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+        ]
+        return {
+            name: [(col[1], col[2]) for col in conn.execute(f'PRAGMA table_info("{name}")')]
+            for name in names
+        }
+    finally:
+        conn.close()
+
+
+def _lookup(db_path: str) -> dict:
+    key = os.path.abspath(db_path)
+    fingerprint = file_fingerprint(db_path)
+
+    with _LOCK:
+        entry = _SCHEMA_CACHE.get(key)
+        # 1) Same file, untouched since last time → reuse as is
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            return entry
+
+    version = read_schema_version(db_path)
+    with _LOCK:
+        entry = _SCHEMA_CACHE.get(key)
+        # 2) Same file (dev, inode), data changed but no DDL → still valid
+        if (
+            entry is not None
+            and entry["fingerprint"][:2] == fingerprint[:2]
+            and entry["schema_version"] == version
+        ):
+            entry["fingerprint"] = fingerprint
+            return entry
+
+    # 3) New file or schema change → introspect once for this version
+    #    (the schema text is rendered on first use, see get_schema_cached)
+    entry = {
+        "fingerprint": fingerprint,
+        "schema_version": version,
+        "schema": None,
+        "tables": _introspect_tables(db_path),
+    }
+    with _LOCK:
+        _SCHEMA_CACHE[key] = entry
+    return entry
+
+
+def get_schema_cached(db_path: str) -> str:
+    """
+    Memoized utils.get_schema(db_path).
+    Invalidated by file identity/mtime and PRAGMA schema_version.
+    """
+    entry = _lookup(db_path)
+    if entry["schema"] is None:
+        # The course's utils is only needed for the text, so the SQL engine,
+        # validation and their tests don't depend on it
+        import utils
+
+        entry["schema"] = utils.get_schema(db_path)
+    return entry["schema"]
+
+
+def get_schema_tables(db_path: str) -> dict:
+    """Cached {table: [(column, type), ...]} for the same schema version."""
+    return _lookup(db_path)["tables"]
+
+
+def clear_schema_cache() -> None:
+    with _LOCK:
+        _SCHEMA_CACHE.clear()
@@ -0,0 +1,217 @@
+import re
+import sqlite3
+import difflib
+import threading
+
+import sql_engine
+import sql_schema
+
+# Counters for reporting what the local stage handled without the LLM
+_STATS = {"validated": 0, "valid": 0, "repaired": 0, "needs_llm": 0, "fences_stripped": 0, "llm_calls_saved": 0}
+_STATS_LOCK = threading.Lock()
+
+# Keywords that show up as column names in generated schemas and need quoting
+_RESERVED = {
+    "order", "group", "select", "from", "where", "table", "index", "limit",
+    "key", "values", "default", "check", "case", "when", "end", "to", "by",
+}
+
+
+def _count(name: str) -> None:
+    with _STATS_LOCK:
+        _STATS[name] += 1
+
+
+def validation_stats() -> dict:
+    """
+    Validation counters: valid as generated, repaired locally, or left to the
+    LLM, plus reflection calls saved (see record_llm_call_saved).
+    """
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def record_llm_call_saved() -> None:
+    """
+    Called by the reflection loop when a local repair made a failing query
+    valid while rounds remain: the round that would have gone to fixing the
+    error is left for reviewing the result (or not needed at all).
+    """
+    _count("llm_calls_saved")
+
+
+def strip_fences(sql: str) -> str:
+    """Drop Markdown code fences / a leading 'sql' tag the model sometimes adds."""
+    sql = sql.strip()
+    m = re.search(r"```(?:sql)?\s*([\s\S]*?)```", sql, flags=re.IGNORECASE)
+    if m:
+        sql = m.group(1)
+    return sql.strip()
+
+
+def explain(sql: str, db_path: str) -> str | None:
+    """
+    Compile `sql` with EXPLAIN QUERY PLAN on a pooled read-only connection.
+    Returns None when it compiles, otherwise SQLite's error message.
+    Nothing is executed.
+    """
+    with sql_engine._POOL.connection(db_path) as conn:
+        try:
+            conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+            return None
+        except (sqlite3.Error, sqlite3.Warning) as e:
+            return str(e)
+
+
+def _replace_identifier(sql: str, old: str, new: str) -> str:
+    """Replace a bare identifier outside of string literals."""
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(rf'(?<![\w"]){re.escape(old)}(?![\w"])', new, parts[i])
+    return "".join(parts)
+
+
+def _fuzzy_unique(name: str, candidates: list[str], cutoff: float = 0.8) -> str | None:
+    """Best fuzzy match for `name`, only if it is clearly the best one."""
+    lowered = {c.lower(): c for c in candidates}
+    if name.lower() in lowered:
+        return lowered[name.lower()]
+    matches = difflib.get_close_matches(name.lower(), list(lowered), n=2, cutoff=cutoff)
+    if not matches:
+        return None
+    if len(matches) == 2:
+        best = difflib.SequenceMatcher(None, name.lower(), matches[0]).ratio()
+        second = difflib.SequenceMatcher(None, name.lower(), matches[1]).ratio()
+        if best - second < 0.05:
+            return None  # ambiguous, leave it to the model
+    return lowered[matches[0]]
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+# What precedes a column reference (as opposed to a clause keyword): a list
+# separator, an open paren, a qualifier dot, an operator or an expression keyword
+_BEFORE_IDENTIFIER = re.compile(
+    r"(?:[,(.=<>+*/-]|\b(?:select|distinct|by|where|and|or|not|on|when|then|else|having|set))\s*$",
+    re.IGNORECASE,
+)
+
+
+def _quote_identifier(sql: str, name: str) -> str:
+    """
+    Quote `name` where it is used as a column, outside of string literals.
+    Keyword uses of the same word (ORDER BY, CASE ... END) are left alone.
+    """
+    single_word = re.fullmatch(r"\w+", name) is not None
+    word = re.compile(rf'(?<!["\w]){re.escape(name)}(?!["\w])', re.IGNORECASE)
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    for i in range(0, len(parts), 2):
+        text = parts[i]
+
+        def replace(m):
+            if single_word:
+                before = text[: m.start()]
+                if not _BEFORE_IDENTIFIER.search(before):
+                    return m.group(0)
+                if re.match(r"\s+by\b", text[m.end():], re.IGNORECASE):
+                    return m.group(0)
+            return _quote(name)
+
+        parts[i] = word.sub(replace, text)
+    return "".join(parts)
+
+
+def _repair_once(sql: str, error: str, tables: dict) -> tuple[str, str] | None:
+    """Try a single unambiguous fix for `error`; returns (sql, description) or None."""
+    all_columns = sorted({col for cols in tables.values() for col, _ in cols})
+
+    m = re.match(r"no such column: (?:(\w+)\.)?(\S+)", error)
+    if m:
+        qualifier, bad = m.group(1), m.group(2)
+        fixed = _fuzzy_unique(bad, all_columns)
+        if fixed and fixed != bad:
+            target = f"{qualifier}.{bad}" if qualifier else bad
+            replacement = f"{qualifier}.{fixed}" if qualifier else fixed
+            return _replace_identifier(sql, target, replacement), f"column {bad} → {fixed}"
+        return None
+
+    m = re.match(r"no such table: (?:\w+\.)?(\S+)", error)
+    if m:
+        bad = m.group(1)
+        fixed = _fuzzy_unique(bad, list(tables))
+        if fixed and fixed != bad:
+            return _replace_identifier(sql, bad, fixed), f"table {bad} → {fixed}"
+        return None
+
+    m = re.match(r'near "(\w+)": syntax error', error)
+    if m and m.group(1) not in tables:
+        # Misspelled table name that happens to be a keyword (e.g. "transaction")
+        fixed = _fuzzy_unique(m.group(1), list(tables))
+        if fixed and fixed.lower() != m.group(1).lower():
+            return _replace_identifier(sql, m.group(1), fixed), f"table {m.group(1)} → {fixed}"
+
+    m = re.match(r'near "([^"]+)": syntax error', error)
+    if m:
+        # The token SQLite choked on is an unquoted column name that is a
+        # keyword ("order") or one word of a name with spaces ("unit price")
+        token = m.group(1).lower()
+        for col in all_columns:
+            if re.fullmatch(r"\w+", col):
+                named = col.lower() in _RESERVED and col.lower() == token
+            else:
+                named = token in re.split(r"\W+", col.lower())
+            if not named:
+                continue
+            fixed = _quote_identifier(sql, col)
+            if fixed != sql:
+                return fixed, f"quoted {col}"
+    return None
+
+
+def validate_sql(sql: str, db_path: str, max_repairs: int = 3) -> dict:
+    """
+    Check generated SQL locally before running it.
+
+    1) strip code fences
+    2) EXPLAIN QUERY PLAN against the database (catches syntax errors and
+       unknown tables/columns without executing anything)
+    3) on failure, apply unambiguous repairs using the cached schema
+       (fuzzy column/table names, quoting) and re-check, up to `max_repairs`
+
+    Returns {"ok", "sql", "error", "repairs", "stripped_fences"}; "sql" is
+    the repaired query. Fence stripping is not a repair: it doesn't count
+    toward `max_repairs` or the "repaired" stat.
+    """
+    _count("validated")
+    original = sql
+    sql = strip_fences(sql)
+    stripped_fences = sql != original.strip()
+    if stripped_fences:
+        _count("fences_stripped")
+    repairs = []
+
+    error = explain(sql, db_path)
+    tables = sql_schema.get_schema_tables(db_path) if error else {}
+    while error and len(repairs) < max_repairs:
+        fix = _repair_once(sql, error, tables)
+        if fix is None:
+            break
+        sql, description = fix
+        repairs.append(description)
+        error = explain(sql, db_path)
+
+    if error:
+        _count("needs_llm")
+    elif repairs:
+        _count("repaired")
+    else:
+        _count("valid")
+    return {
+        "ok": error is None,
+        "sql": sql,
+        "error": error,
+        "repairs": repairs,
+        "stripped_fences": stripped_fences,
+    }
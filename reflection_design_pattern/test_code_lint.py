@@ -0,0 +1,21 @@
+import code_lint
+
+
+def test_repeated_to_datetime_is_hoisted():
+    code, applied = code_lint.autofix("a = pd.to_datetime(df['date'])\nb = pd.to_datetime(df['date']).dt.year")
+    assert len(applied) == 1
+    assert code.count("pd.to_datetime") == 1
+
+
+def test_no_hoist_across_in_place_mutation():
+    code = (
+        "a = pd.to_datetime(df['date'])\n"
+        "df.dropna(subset=['price'], inplace=True)\n"
+        "b = pd.to_datetime(df['date'])"
+    )
+    assert code_lint.autofix(code) == (code, [])
+
+
+def test_no_hoist_across_loc_assignment():
+    code = "a = pd.to_datetime(df['date'])\ndf.loc[:, 'date'] = 0\nb = pd.to_datetime(df['date'])"
+    assert code_lint.autofix(code) == (code, [])
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+import sql_engine
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "test.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER, color TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "red"), (2, "Red"), (3, "blue")])
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_result_with_exactly_max_rows_is_not_truncated(db_path):
+    df = sql_engine.execute_sql("SELECT * FROM t", db_path, max_rows=3, chunk_size=2, cache=None)
+    assert len(df) == 3
+    assert df.attrs["truncated"] is False
+
+
+def test_result_past_max_rows_is_truncated(db_path):
+    df = sql_engine.execute_sql("SELECT * FROM t", db_path, max_rows=2, cache=None)
+    assert len(df) == 2
+    assert df.attrs["truncated"] is True
+
+
+def test_failed_connects_do_not_use_up_the_pool(tmp_path):
+    pool = sql_engine.ConnectionPool(max_size=2, acquire_timeout_s=0.1)
+    missing = str(tmp_path / "missing.db")
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            with pool.connection(missing):
+                pass
+    assert pool._created[missing] == 0
+
+
+def test_busy_pool_times_out(db_path):
+    pool = sql_engine.ConnectionPool(max_size=1, acquire_timeout_s=0.1)
+    with pool.connection(db_path):
+        with pytest.raises(sql_engine.PoolTimeout):
+            with pool.connection(db_path):
+                pass
+
+
+def test_mixed_type_column_is_cached(tmp_path):
+    path = str(tmp_path / "mixed.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (v)")
+    conn.executemany("INSERT INTO t VALUES (?)", [("a",), (3,), (4.5,)])
+    conn.commit()
+    conn.close()
+
+    cache = sql_engine.ResultCache()
+    first = sql_engine.execute_sql("select v from t", path, cache=cache)
+    second = sql_engine.execute_sql("select v from t", path, cache=cache)
+    assert first["v"].tolist() == ["a", 3, 4.5]
+    assert second["v"].tolist() == ["a", 3, 4.5]
+    assert cache.stats()["hits"] == 1
+
+
+def test_double_quoted_strings_keep_their_case(db_path):
+    assert sql_engine.canonical_sql('SELECT id FROM t WHERE color = "red"') != sql_engine.canonical_sql(
+        'SELECT id FROM t WHERE color = "Red"'
+    )
+    cache = sql_engine.ResultCache()
+    red = sql_engine.execute_sql('SELECT id FROM t WHERE color = "red"', db_path, cache=cache)
+    upper = sql_engine.execute_sql('SELECT id FROM t WHERE color = "Red"', db_path, cache=cache)
+    assert red["id"].tolist() == [1]
+    assert upper["id"].tolist() == [2]
+
+
+def test_comment_markers_inside_literals_are_kept():
+    assert sql_engine.normalize_sql("SELECT * FROM t WHERE name = 'a--b'") != sql_engine.normalize_sql(
+        "SELECT * FROM t WHERE name = 'a--c'"
+    )
+
+
+def test_canonical_sql_ignores_keyword_case_and_aliases():
+    assert sql_engine.canonical_sql("SELECT x.id FROM t x -- note\nWHERE x.color = 'red';") == sql_engine.canonical_sql(
+        'select tx.id\nfrom t as tx where tx.color=\'red\''
+    )
@@ -0,0 +1,34 @@
+import sqlite3
+
+import pytest
+
+import sql_validation
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "sales.db"
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE sales ("order" INTEGER, "unit price" REAL, qty INTEGER)')
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def test_quoting_leaves_order_by_alone(db_path):
+    check = sql_validation.validate_sql("SELECT qty, order FROM sales WHERE order > 1 order by qty", db_path)
+    assert check["ok"]
+    assert check["sql"] == 'SELECT qty, "order" FROM sales WHERE "order" > 1 order by qty'
+
+
+def test_quotes_column_with_spaces(db_path):
+    check = sql_validation.validate_sql("SELECT sum(unit price) FROM sales", db_path)
+    assert check["sql"] == 'SELECT sum("unit price") FROM sales'
+    assert check["repairs"] == ["quoted unit price"]
+
+
+def test_fence_stripping_is_not_a_repair(db_path):
+    check = sql_validation.validate_sql("```sql\nSELECT qty FROM sales\n```", db_path, max_repairs=0)
+    assert check["ok"]
+    assert check["stripped_fences"]
+    assert check["repairs"] == []
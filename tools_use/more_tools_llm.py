@@ -1,15 +1,41 @@
-import requests
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
 import qrcode
+from PIL import Image
 from qrcode.image.styledpil import StyledPilImage
 
+# Shared keep-alive session with retries/timeouts and TTL caches for tool calls
+import tool_cache
+# Decorator registry (schemas from signatures) and async runtime for the tools
+import tool_registry
+import tool_runtime
+
+# Registering leaves the functions unchanged, so they can still go to aisuite as-is
+registry = tool_registry.ToolRegistry()
+
+# Point these at tool_cache.stub_server(...) to run without the real APIs
+IPINFO_URL = os.environ.get("IPINFO_URL", "https://ipinfo.io/json")
+OPEN_METEO_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+# The IP's location rarely changes; the forecast does, but not minute to minute
+location_cache = tool_cache.TTLCache(ttl_seconds=6 * 3600)
+weather_cache = tool_cache.TTLCache(ttl_seconds=10 * 60)
+
 
+@registry.tool(timeout_s=15.0)
 def get_weather_from_ip():
     """
     Gets the current, high, and low temperature in Fahrenheit for the user's
     location and returns it to the user.
     """
-    # Get location coordinates from the IP address
-    lat, lon = requests.get('https://ipinfo.io/json').json()['loc'].split(',')
+    # Get location coordinates from the IP address (cached for hours)
+    loc = location_cache.get_or_set(IPINFO_URL, lambda: tool_cache.get_json(IPINFO_URL)["loc"])
+    # ~1 km grid, so nearby lookups share one forecast
+    lat, lon = (round(float(x), 2) for x in loc.split(','))
 
     # Set parameters for the weather API call
     params = {
@@ -21,8 +47,10 @@ def get_weather_from_ip():
         "timezone": "auto"
     }
 
-    # Get weather data
-    weather_data = requests.get("https://api.open-meteo.com/v1/forecast", params=params).json()
+    # Get weather data (cached for minutes per rounded lat/lon)
+    weather_data = weather_cache.get_or_set(
+        (lat, lon), lambda: tool_cache.get_json(OPEN_METEO_URL, params=params)
+    )
 
     # Format and return the simplified string
     return (
@@ -32,6 +60,7 @@ def get_weather_from_ip():
     )
 
 # Write a text file
+@registry.tool
 def write_txt_file(file_path: str, content: str):
     """
     Write a string into a .txt file (overwrites if exists).
@@ -46,7 +75,8 @@ def write_txt_file(file_path: str, content: str):
     return file_path
 
 
-# Create a QR code
+# Create a QR code (image rendering is CPU work: run it in the process pool)
+@registry.tool(kind="cpu", timeout_s=30.0)
 def generate_qr_code(data: str, filename: str, image_path: str):
     """Generate a QR code image given data and an image path.
 
@@ -55,14 +85,123 @@ def generate_qr_code(data: str, filename: str, image_path: str):
         filename: Name for the output PNG file (without extension)
         image_path: Path to the image to be used in the QR code
     """
+    output_file = f"{filename}.png"
+    _render_qr(data, output_file, load_logo(image_path))
+
+    return f"QR code saved as {output_file} containing: {data[:50]}..."
+
+
+# Logos are decoded and downscaled once per (path, mtime), not once per code
+_LOGO_CACHE = {}
+_LOGO_LOCK = threading.Lock()
+# The logo covers ~25% of the code's width, so a few hundred pixels is plenty
+LOGO_MAX_SIDE = 256
+
+
+def load_logo(image_path: str, max_side: int = LOGO_MAX_SIDE) -> Image.Image:
+    """Decoded, RGB(A), downscaled logo; cached until the file changes."""
+    key = (os.path.abspath(image_path), os.stat(image_path).st_mtime_ns, max_side)
+    with _LOGO_LOCK:
+        logo = _LOGO_CACHE.get(key)
+    if logo is None:
+        with Image.open(image_path) as src:
+            logo = src.convert("RGBA" if "A" in src.getbands() or "transparency" in src.info else "RGB")
+        logo.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        with _LOGO_LOCK:
+            # Drop entries for older versions of the same file
+            for old in [k for k in _LOGO_CACHE if k[0] == key[0]]:
+                del _LOGO_CACHE[old]
+            _LOGO_CACHE[key] = logo
+    return logo
+
+
+def _render_qr(data: str, output_file: str, logo: Image.Image) -> None:
     qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_H)
     qr.add_data(data)
+    img = qr.make_image(image_factory=StyledPilImage, embedded_image=logo)
 
-    img = qr.make_image(image_factory=StyledPilImage, embedded_image_path=image_path)
-    output_file = f"{filename}.png"
-    img.save(output_file)
+    # Stream the PNG straight to disk, then publish it atomically
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb", buffering=1 << 16) as f:
+        img.save(f, format="PNG")
+    os.replace(tmp_file, output_file)
 
-    return f"QR code saved as {output_file} containing: {data[:50]}..."
+
+_worker_logo = None
+
+
+def _init_qr_worker(image_path: str) -> None:
+    global _worker_logo
+    _worker_logo = load_logo(image_path)
+
+
+def _render_qr_job(job: tuple) -> str | None:
+    """Worker side of generate_qr_codes_batch; returns an error string or None."""
+    data, output_file = job
+    try:
+        _render_qr(data, output_file, _worker_logo)
+        return None
+    except Exception as e:
+        return f"{output_file}: {type(e).__name__}: {e}"
+
+
+def generate_qr_codes_batch(
+    data_items: list[str],
+    image_path: str,
+    output_dir: str = "qr_codes",
+    filename_prefix: str = "qr",
+    workers: int | None = None,
+    chunksize: int = 16,
+) -> dict:
+    """
+    Render one QR code per entry of `data_items`, all with the same logo.
+
+    - the logo is decoded/downscaled once per worker process (load_logo)
+    - codes are rendered across a process pool in chunks of `chunksize`
+    - each worker streams its PNGs to `output_dir/{filename_prefix}_{i}.png`
+      directly, so no image bytes travel back to this process
+
+    Returns {"files", "errors", "seconds", "codes_per_sec"}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    width = len(str(max(len(data_items) - 1, 0)))
+    files = [os.path.join(output_dir, f"{filename_prefix}_{i:0{width}d}.png") for i in range(len(data_items))]
+    load_logo(image_path)  # fail fast on a bad logo, before starting workers
+
+    start = time.perf_counter()
+    errors = []
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_qr_worker,
+        initargs=(image_path,),
+    ) as pool:
+        for error in pool.map(_render_qr_job, zip(data_items, files), chunksize=chunksize):
+            if error:
+                errors.append(error)
+    seconds = time.perf_counter() - start
+
+    return {
+        "files": files,
+        "errors": errors,
+        "seconds": seconds,
+        "codes_per_sec": len(data_items) / seconds if seconds else 0.0,
+    }
+
+# Many conversations asking at once: one weather lookup, QR codes off the event loop
+runtime = tool_runtime.ToolRuntime(registry)
+
+async def _demo_concurrent_tools():
+    calls = [("get_weather_from_ip", {})] * 10
+    results = await runtime.call_many(calls)
+    print(results[0], runtime.stats)  # executions: 1, coalesced: 9
+
+#asyncio.run(_demo_concurrent_tools())
+
+# QR codes for a whole catalog: logo prepared once, rendering spread over all cores
+#catalog = [f"https://www.deeplearning.ai/products/{i}" for i in range(1000)]
+#report = generate_qr_codes_batch(catalog, "dl_logo.jpg", output_dir="catalog_qr")
+#print(f"{len(report['files'])} codes in {report['seconds']:.1f}s ({report['codes_per_sec']:.0f} codes/s)")
 
 prompt = "Can you get the weather for my location?"
 
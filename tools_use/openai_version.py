@@ -2,21 +2,39 @@
 from openai import OpenAI
 client = OpenAI()
 import json
+import asyncio
+
+import tool_registry
+import tool_runtime
+
+#tools are declared once: the registry derives each JSON schema from the
+#type hints and docstring, and dispatches by name through a dict
+registry = tool_registry.ToolRegistry()
 
 #having multiple tools
+@registry.tool
 def get_weather(city: str):
+    """Get real-time weather for a city."""
     return {"city": city, "temp": "22°C", "condition": "Clear"}
 
+@registry.tool
 def get_time(timezone: str):
+    """Get current time in any timezone."""
     return {"timezone": timezone, "time": "14:32"}
 
+@registry.tool(timeout_s=15.0)
 def search_wikipedia(query: str):
+    """Search Wikipedia and return summary."""
     return {"query": query, "summary": "This is a demo summary."}
 
+@registry.tool
 def calculate_distance(city1: str, city2: str):
+    """Calculate distance in km between two cities."""
     return {"city1": city1, "city2": city2, "distance_km": 450}
 
+@registry.tool
 def convert_currency(amount: float, from_currency: str, to_currency: str):
+    """Convert currency amounts."""
     converted = amount * 1.1  # dummy conversion
     return {
         "amount": amount,
@@ -25,95 +43,54 @@ def convert_currency(amount: float, from_currency: str, to_currency: str):
         "converted": converted
     }
 
-#Declare Tools for the Model
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "get_weather",
-            "description": "Get real-time weather for a city.",
-            "parameters": {
-                "type": "object",
-                "properties": {"city": {"type": "string"}},
-                "required": ["city"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "get_time",
-            "description": "Get current time in any timezone.",
-            "parameters": {
-                "type": "object",
-                "properties": {"timezone": {"type": "string"}},
-                "required": ["timezone"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "search_wikipedia",
-            "description": "Search Wikipedia and return summary.",
-            "parameters": {
-                "type": "object",
-                "properties": {"query": {"type": "string"}},
-                "required": ["query"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "calculate_distance",
-            "description": "Calculate distance in km between two cities.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "city1": {"type": "string"},
-                    "city2": {"type": "string"},
-                },
-                "required": ["city1", "city2"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "convert_currency",
-            "description": "Convert currency amounts.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "amount": {"type": "number"},
-                    "from_currency": {"type": "string"},
-                    "to_currency": {"type": "string"},
-                },
-                "required": ["amount", "from_currency", "to_currency"]
-            }
-        }
-    }
-]
+#Declare Tools for the Model (built once from the registry and cached)
+tools = registry.schemas()
 
-#tool dispatcher
+#tool dispatcher: O(1) lookup + precompiled argument validation
 def call_tool(tool_name, tool_args):
-    if tool_name == "get_weather":
-        return get_weather(**tool_args)
-    if tool_name == "get_time":
-        return get_time(**tool_args)
-    if tool_name == "search_wikipedia":
-        return search_wikipedia(**tool_args)
-    if tool_name == "calculate_distance":
-        return calculate_distance(**tool_args)
-    if tool_name == "convert_currency":
-        return convert_currency(**tool_args)
+    return registry.dispatch(tool_name, tool_args)
+
+
+#per-tool time limits come from @registry.tool(timeout_s=...); the rest get this
+DEFAULT_TOOL_TIMEOUT_S = 10.0
+
+#tools run here: threads for blocking I/O, a process pool for kind="cpu",
+#identical in-flight calls (e.g. from parallel conversations) share one execution
+runtime = tool_runtime.ToolRuntime(registry, default_timeout_s=DEFAULT_TOOL_TIMEOUT_S)
+
+
+async def run_tool_call(tool_call) -> dict:
+    """Run one tool call and return its `tool` message (errors and timeouts included)."""
+    tool_name = tool_call.function.name
+    try:
+        tool_args = json.loads(tool_call.function.arguments or "{}")
+        tool_result = await runtime.call(tool_name, tool_args)
+    except asyncio.TimeoutError:
+        # A sync tool can't be interrupted; its thread finishes in the background
+        tool_result = {"error": f"{tool_name} timed out"}
+    except Exception as e:
+        tool_result = {"error": f"{type(e).__name__}: {e}"}
+
+    return {
+        "role": "tool",
+        "tool_call_id": tool_call.id,
+        "name": tool_name,
+        "content": json.dumps(tool_result, default=str),
+    }
+
+
+async def run_tool_calls_async(tool_calls) -> list[dict]:
+    """All tool calls of a turn concurrently; messages come back in call order."""
+    return list(await asyncio.gather(*(run_tool_call(tc) for tc in tool_calls)))
 
-    raise ValueError(f"Unknown tool: {tool_name}")
+
+def run_tool_calls(tool_calls) -> list[dict]:
+    """Blocking wrapper; also works when an event loop is already running (notebooks)."""
+    return runtime.run(run_tool_calls_async(tool_calls))
 
 
 #LLM decides which tool to call
-user_message = "How far is London from Paris?"
+user_message = "How far is London from Paris, and what is the weather in both cities?"
 
 response = client.chat.completions.create(
     model="gpt-4.1",
@@ -122,33 +99,25 @@ response = client.chat.completions.create(
     tool_choice="auto"
 )
 
-#exec the tool
+#exec every tool the model asked for in this turn, concurrently
 message = response.choices[0].message
 
 if message.tool_calls:
-    tool_call = message.tool_calls[0]
-    tool_name = tool_call.function.name
-    tool_args = json.loads(tool_call.function.arguments)
-
-    print("Model selected tool:", tool_name)
-
-    # Run the correct tool using our dispatcher
-    tool_result = call_tool(tool_name, tool_args)
-
-#o/p result back to model
-final_response = client.chat.completions.create(
-    model="gpt-4.1",
-    messages=[
-        {"role": "user", "content": user_message},
-        message,
-        {
-            "role": "tool",
-            "tool_call_id": tool_call.id,
-            "name": tool_name,
-            "content": json.dumps(tool_result)
-        }
-    ]
-)
+    print("Model selected tools:", [tc.function.name for tc in message.tool_calls])
+
+    # Run all calls through the dispatcher at once (ordered like message.tool_calls)
+    tool_messages = run_tool_calls(message.tool_calls)
+
+    #o/p all results back to model in one follow-up request
+    final_response = client.chat.completions.create(
+        model="gpt-4.1",
+        messages=[
+            {"role": "user", "content": user_message},
+            message,
+            *tool_messages,
+        ]
+    )
+else:
+    final_response = response
 
 print("Assistant:", final_response.choices[0].message.content)
-
@@ -0,0 +1,78 @@
+import pytest
+
+import tool_cache
+
+WEATHER = {
+    "current": {"temperature_2m": 68.2},
+    "daily": {"temperature_2m_max": [74.1], "temperature_2m_min": [55.0]},
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for TTL expiry."""
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def weather_server():
+    with tool_cache.stub_server({"/v1/forecast": WEATHER}) as server:
+        yield server
+
+
+def lookup(cache, server, lat=51.51, lon=-0.13):
+    url = server.url + "/v1/forecast"
+    return cache.get_or_set((lat, lon), lambda: tool_cache.get_json(url, params={"latitude": lat, "longitude": lon}))
+
+
+def test_second_lookup_within_ttl_is_a_hit(clock, weather_server):
+    cache = tool_cache.TTLCache(ttl_seconds=600)
+    assert lookup(cache, weather_server) == WEATHER
+    clock[0] += 599
+    assert lookup(cache, weather_server) == WEATHER
+
+    assert weather_server.calls == ["/v1/forecast"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_after_ttl_refetches(clock, weather_server):
+    cache = tool_cache.TTLCache(ttl_seconds=600)
+    lookup(cache, weather_server)
+    clock[0] += 600
+    assert lookup(cache, weather_server) == WEATHER
+
+    assert weather_server.calls == ["/v1/forecast", "/v1/forecast"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(weather_server):
+    cache = tool_cache.TTLCache(ttl_seconds=600, max_entries=2)
+    lookup(cache, weather_server, lat=1.0)
+    lookup(cache, weather_server, lat=2.0)
+    lookup(cache, weather_server, lat=1.0)
+    lookup(cache, weather_server, lat=3.0)  # evicts lat=2.0
+
+    assert cache.get((1.0, -0.13)) is not None
+    assert cache.get((2.0, -0.13)) is None
+
+
+def test_requests_share_one_pooled_session(weather_server):
+    session = tool_cache.get_session()
+    lookup(tool_cache.TTLCache(ttl_seconds=0), weather_server)
+    lookup(tool_cache.TTLCache(ttl_seconds=0), weather_server)
+
+    assert tool_cache.get_session() is session
+    adapter = session.get_adapter(weather_server.url)
+    assert adapter.max_retries.total == 3
+    # Both requests went through the shared adapter's single pool for this host
+    port = int(weather_server.url.rsplit(":", 1)[1])
+    pools = adapter.poolmanager.pools
+    assert [pools[key].num_connections for key in pools.keys() if key.key_port == port] == [1]
+
+
+def test_http_errors_raise(weather_server):
+    with pytest.raises(tool_cache.requests.HTTPError):
+        tool_cache.get_json(weather_server.url + "/missing")
@@ -0,0 +1,105 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+import tool_registry
+import tool_runtime
+
+
+@pytest.fixture
+def slow_tool():
+    """An async tool that runs until `release` is set; counts starts and cancellations."""
+    registry = tool_registry.ToolRegistry()
+    state = {"started": 0, "cancelled": 0, "release": threading.Event()}
+
+    @registry.tool()
+    async def lookup(city: str) -> dict:
+        """Look up a city."""
+        state["started"] += 1
+        try:
+            while not state["release"].is_set():
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+        return {"city": city}
+
+    runtime = tool_runtime.ToolRuntime(registry)
+    yield runtime, state
+    state["release"].set()
+    runtime.close()
+
+
+def wait_until(condition, timeout_s=2.0):
+    deadline = time.monotonic() + timeout_s
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met"
+        time.sleep(0.01)
+
+
+def test_calls_from_separate_event_loops_share_one_execution(slow_tool):
+    runtime, state = slow_tool
+    results, errors = [], []
+
+    def conversation():
+        try:
+            results.append(asyncio.run(runtime.call("lookup", {"city": "Paris"})))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=conversation) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: runtime.stats["calls"] == 5)
+    state["release"].set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [{"city": "Paris"}] * 5
+    assert state["started"] == 1
+    assert runtime.stats["coalesced"] == 4
+
+
+def test_execution_is_cancelled_when_every_caller_leaves(slow_tool):
+    runtime, state = slow_tool
+
+    async def abandon():
+        task = asyncio.ensure_future(runtime.call("lookup", {"city": "Paris"}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    threads = [threading.Thread(target=asyncio.run, args=(abandon(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wait_until(lambda: state["cancelled"] == 1)
+    assert state["started"] == 1
+
+    # An identical call after the cancellation starts a fresh execution
+    state["release"].set()
+    assert runtime.run(runtime.call("lookup", {"city": "Paris"})) == {"city": "Paris"}
+    assert state["started"] == 2
+
+
+def test_one_caller_leaving_does_not_cancel_the_others(slow_tool):
+    runtime, state = slow_tool
+
+    async def main():
+        leaver = asyncio.ensure_future(runtime.call("lookup", {"city": "Paris"}))
+        stayer = asyncio.ensure_future(runtime.call("lookup", {"city": "Paris"}))
+        await asyncio.sleep(0.05)
+        leaver.cancel()
+        await asyncio.sleep(0.05)
+        state["release"].set()
+        return await stayer
+
+    assert asyncio.run(main()) == {"city": "Paris"}
+    assert state["started"] == 1
+    assert state["cancelled"] == 0
@@ -0,0 +1,150 @@
+import json
+import time
+import threading
+from types import SimpleNamespace
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds for every tool HTTP call
+DEFAULT_TIMEOUT = (3.05, 10)
+
+
+class TTLCache:
+    """
+    In-memory cache for tool results: entries expire `ttl_seconds` after
+    they were stored, least recently used entries go past `max_entries`.
+    Safe to share between threads.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                self._data.pop(key, None)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        """Cached value for `key`, calling `compute()` (and storing it) on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._data),
+        }
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide keep-alive session: connections to the same host are reused,
+    and idempotent requests are retried with backoff on connection errors
+    and 429/5xx responses.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"}),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=8, pool_maxsize=16)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def get_json(url: str, params: dict | None = None, timeout=DEFAULT_TIMEOUT):
+    """GET `url` through the shared session and decode JSON; raises on HTTP errors."""
+    response = get_session().get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+@contextmanager
+def stub_server(routes: dict):
+    """
+    Local stand-in for the HTTP APIs tools call, for tests and offline demos.
+    `routes` maps a path ("/json") to a JSON-able payload or to a
+    callable(query_string) returning one. Yields an object with the base
+    `url` and the list of requested paths (`calls`), e.g.
+
+        with stub_server({"/json": {"loc": "51.5,-0.12"}}) as server:
+            get_json(server.url + "/json")
+            assert server.calls == ["/json"]
+    """
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            calls.append(parsed.path)
+            route = routes.get(parsed.path)
+            if route is None:
+                self.send_error(404)
+                return
+            payload = route(parsed.query) if callable(route) else route
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield SimpleNamespace(url=f"http://127.0.0.1:{server.server_address[1]}", calls=calls)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,224 @@
+import re
+import json
+import types
+import typing
+import inspect
+
+
+class ToolArgumentError(ValueError):
+    """The model called a tool with missing, unknown or mistyped arguments."""
+
+
+# Python annotation → JSON schema type (and the Python types accepted for it)
+_JSON_TYPES = {
+    str: ("string", (str,)),
+    int: ("integer", (int,)),
+    float: ("number", (int, float)),
+    bool: ("boolean", (bool,)),
+    list: ("array", (list,)),
+    tuple: ("array", (list,)),
+    dict: ("object", (dict,)),
+}
+
+
+def _parse_docstring(func) -> tuple[str, dict]:
+    """
+    Summary (text before any Args/Returns section) and per-parameter
+    descriptions from a Google-style "Args:" block.
+    """
+    doc = inspect.getdoc(func) or ""
+    sections = re.split(r"^\s*(Args|Arguments|Parameters|Returns|Raises):\s*$", doc, flags=re.MULTILINE)
+    summary = " ".join(sections[0].split())
+    params = {}
+    for header, body in zip(sections[1::2], sections[2::2]):
+        if header not in ("Args", "Arguments", "Parameters"):
+            continue
+        current = None
+        for line in body.splitlines():
+            match = re.match(r"^\s*(\w+)\s*(\([^)]*\))?\s*:\s*(.*)$", line)
+            if match:
+                current = match.group(1)
+                params[current] = match.group(3).strip()
+            elif current and line.strip():
+                params[current] += " " + line.strip()
+    return summary, params
+
+
+def _unwrap_optional(annotation):
+    """X for Optional[X] / X | None; the annotation itself otherwise."""
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _schema_for(annotation) -> dict:
+    annotation, _ = _unwrap_optional(annotation)
+    origin = typing.get_origin(annotation)
+    if origin is typing.Literal:
+        values = list(typing.get_args(annotation))
+        return {"type": _JSON_TYPES.get(type(values[0]), ("string",))[0], "enum": values}
+    if origin in (list, tuple):
+        args = typing.get_args(annotation)
+        return {"type": "array", "items": _schema_for(args[0])} if args else {"type": "array"}
+    if origin is dict:
+        return {"type": "object"}
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation][0]}
+    return {}  # unannotated / unknown: accept anything
+
+
+def _compile_validator(name: str, params: dict, required: set):
+    """
+    Build the argument check for one tool once, at registration time.
+    `params` maps argument name → (accepted Python types or None, enum or None).
+    """
+    allowed = frozenset(params)
+
+    def validate(args: dict) -> dict:
+        if not isinstance(args, dict):
+            raise ToolArgumentError(f"{name}: arguments must be a JSON object")
+        missing = required - args.keys()
+        if missing:
+            raise ToolArgumentError(f"{name}: missing argument(s) {', '.join(sorted(missing))}")
+        unknown = args.keys() - allowed
+        if unknown:
+            raise ToolArgumentError(f"{name}: unknown argument(s) {', '.join(sorted(unknown))}")
+        for arg, value in args.items():
+            accepted, enum = params[arg]
+            if value is None:
+                continue
+            # bool is an int subclass; don't let True pass as a number
+            if accepted and (not isinstance(value, accepted) or (isinstance(value, bool) and bool not in accepted)):
+                raise ToolArgumentError(f"{name}: {arg} should be {accepted[-1].__name__}, got {type(value).__name__}")
+            if enum is not None and value not in enum:
+                raise ToolArgumentError(f"{name}: {arg} must be one of {enum}")
+        return args
+
+    return validate
+
+
+class Tool:
+    """A registered function with its JSON schema and compiled validator."""
+
+    def __init__(
+        self,
+        func,
+        name: str | None = None,
+        description: str | None = None,
+        timeout_s: float | None = None,
+        kind: str = "io",
+    ):
+        if kind not in ("io", "cpu"):
+            raise ValueError(f"kind must be 'io' or 'cpu', got {kind!r}")
+        self.func = func
+        self.name = name or func.__name__
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.timeout_s = timeout_s
+        self.kind = kind  # where tool_runtime runs it: event loop / threads, or a process pool
+
+        summary, param_docs = _parse_docstring(func)
+        hints = typing.get_type_hints(func)
+        properties, required, checks = {}, set(), {}
+        for param in inspect.signature(func).parameters.values():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            annotation = hints.get(param.name, inspect.Parameter.empty)
+            schema = _schema_for(annotation) if annotation is not inspect.Parameter.empty else {}
+            if param.name in param_docs:
+                schema["description"] = param_docs[param.name]
+            properties[param.name] = schema
+
+            base, optional = _unwrap_optional(annotation)
+            base = typing.get_origin(base) or base
+            accepted = _JSON_TYPES[base][1] if base in _JSON_TYPES else None
+            checks[param.name] = (accepted, schema.get("enum"))
+            if param.default is inspect.Parameter.empty and not optional:
+                required.add(param.name)
+
+        self.schema = {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": description or summary,
+                "parameters": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": [p for p in properties if p in required],
+                },
+            },
+        }
+        self.validate = _compile_validator(self.name, checks, required)
+
+    def __call__(self, **kwargs):
+        return self.func(**self.validate(kwargs))
+
+
+class ToolRegistry:
+    """
+    Tools declared with a decorator; schemas are derived from the signature
+    (type hints) and docstring (summary + "Args:" block) once, at registration.
+
+        registry = ToolRegistry()
+
+        @registry.tool
+        def get_weather(city: str):
+            ...  # the docstring becomes the tool description
+
+        client.chat.completions.create(..., tools=registry.schemas())
+        registry.dispatch("get_weather", {"city": "Paris"})
+
+    Dispatch is a dict lookup plus the tool's precompiled validator, and the
+    tool list / its JSON are built once and reused until the registry changes.
+    """
+
+    def __init__(self):
+        self._tools = {}
+        self._schemas = None
+        self._schemas_json = None
+
+    def tool(
+        self,
+        func=None,
+        *,
+        name: str | None = None,
+        description: str | None = None,
+        timeout_s: float | None = None,
+        kind: str = "io",
+    ):
+        """Register `func`; usable as @registry.tool or @registry.tool(timeout_s=..., kind="cpu")."""
+        def register(f):
+            entry = Tool(f, name=name, description=description, timeout_s=timeout_s, kind=kind)
+            self._tools[entry.name] = entry
+            self._schemas = self._schemas_json = None
+            return f
+        return register(func) if func is not None else register
+
+    def get(self, name: str) -> Tool:
+        try:
+            return self._tools[name]
+        except KeyError:
+            raise ValueError(f"Unknown tool: {name}") from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def schemas(self) -> list[dict]:
+        """The `tools=` list for chat.completions.create (cached)."""
+        if self._schemas is None:
+            self._schemas = [entry.schema for entry in self._tools.values()]
+        return self._schemas
+
+    def schemas_json(self) -> str:
+        """schemas() serialized once, e.g. for hashing or logging."""
+        if self._schemas_json is None:
+            self._schemas_json = json.dumps(self.schemas(), separators=(",", ":"))
+        return self._schemas_json
+
+    def dispatch(self, name: str, args: dict):
+        """Validate `args` and call the tool (sync tools only; await async ones yourself)."""
+        return self.get(name)(**args)
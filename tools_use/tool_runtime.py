@@ -0,0 +1,195 @@
+import os
+import json
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from tool_registry import ToolRegistry
+
+
+def _call(func, kwargs):
+    # Module-level so it pickles for the process pool
+    return func(**kwargs)
+
+
+class ToolRuntime:
+    """
+    Async execution of registry tools:
+
+    - async tools are awaited on the event loop; blocking "io" tools run in a
+      thread pool; "cpu" tools (registered with kind="cpu") in a process pool
+    - single-flight: identical calls (same tool, same arguments) that are in
+      flight at the same time share one execution and its result
+    - cancellation: when every caller waiting on an execution is cancelled or
+      times out (e.g. its conversation task was abandoned), the execution is
+      cancelled too; blocking tools that already started can't be interrupted,
+      their result is simply dropped
+    - executions and the in-flight table live on one runtime event loop in a
+      daemon thread, so callers on any loop or thread (asyncio.run per
+      conversation turn) can share them
+
+        runtime = ToolRuntime(registry)
+        result = await runtime.call("get_weather", {"city": "Paris"})
+        result = runtime.run(runtime.call("get_weather", {"city": "Paris"}))
+    """
+
+    def __init__(
+        self,
+        registry: ToolRegistry,
+        io_workers: int = 16,
+        cpu_workers: int | None = None,
+        default_timeout_s: float = 10.0,
+    ):
+        self.registry = registry
+        self.default_timeout_s = default_timeout_s
+        self._threads = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="tool-io")
+        self._cpu_workers = cpu_workers or os.cpu_count() or 2
+        self._processes = None  # started on first cpu tool call
+        self._inflight = {}  # (name, args json) -> [task, n_waiters]; runtime loop only
+        self._callers = {}  # token -> runtime-loop task of a call() from another loop
+        self._loop = None  # started on first call
+        self._loop_lock = threading.Lock()
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "cancelled": 0, "timeouts": 0, "errors": 0}
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # fork: tools defined in a notebook-style __main__ stay importable in workers
+            self._processes = ProcessPoolExecutor(
+                max_workers=self._cpu_workers, mp_context=multiprocessing.get_context("fork")
+            )
+        return self._processes
+
+    def _runtime_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="tool-runtime", daemon=True).start()
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the runtime loop and block until it's done."""
+        loop = self._runtime_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("ToolRuntime.run() called from the runtime loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def _execute(self, tool, args: dict):
+        self.stats["executions"] += 1
+        if tool.is_async:
+            return await tool.func(**args)
+        loop = asyncio.get_running_loop()
+        if tool.kind == "cpu":
+            return await loop.run_in_executor(self._process_pool(), _call, tool.func, args)
+        return await loop.run_in_executor(self._threads, functools.partial(tool.func, **args))
+
+    async def call(self, name: str, args: dict, timeout_s: float | None = None):
+        """
+        Validate `args` and run the tool, joining an identical in-flight call
+        if there is one. Raises asyncio.TimeoutError after `timeout_s` if
+        given, else the tool's registry timeout_s, else the runtime default.
+        Can be awaited from any event loop; cancelling the caller cancels its
+        wait on the runtime loop.
+        """
+        tool = self.registry.get(name)
+        args = tool.validate(args)
+        if timeout_s is None:
+            timeout_s = tool.timeout_s if tool.timeout_s is not None else self.default_timeout_s
+
+        loop = self._runtime_loop()
+        if asyncio.get_running_loop() is loop:
+            return await self._call(name, tool, args, timeout_s)
+        token = object()
+        future = asyncio.run_coroutine_threadsafe(self._tracked(token, name, tool, args, timeout_s), loop)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Wait until the runtime loop has let go of the execution, so an
+            # identical call made right after this one starts a fresh execution
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._abandon(token), loop))
+            raise
+
+    async def _tracked(self, token, *call_args):
+        self._callers[token] = asyncio.current_task()
+        try:
+            return await self._call(*call_args)
+        finally:
+            self._callers.pop(token, None)
+
+    async def _abandon(self, token) -> None:
+        task = self._callers.get(token)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait([task])
+
+    async def _call(self, name: str, tool, args: dict, timeout_s: float):
+        # Runs on the runtime loop: the only place _inflight and stats are touched
+        self.stats["calls"] += 1
+
+        key = (name, json.dumps(args, sort_keys=True, default=str))
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(self._execute(tool, args))
+            entry = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, entry=entry: self._forget(key, entry))
+        else:
+            self.stats["coalesced"] += 1
+        task = entry[0]
+
+        entry[1] += 1
+        try:
+            # shield: one caller giving up must not cancel the others' execution
+            return await asyncio.wait_for(asyncio.shield(task), timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                # Nobody is waiting for it any more. Forget it right away, so an
+                # identical call arriving before the task finishes cancelling
+                # starts a fresh execution instead of joining a dead one
+                self._forget(key, entry)
+                task.cancel()
+
+    def _forget(self, key, entry) -> None:
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def _cancel_inflight(self) -> None:
+        for entry in list(self._inflight.values()):
+            entry[0].cancel()
+
+    async def call_many(self, calls: list[tuple[str, dict]]) -> list:
+        """
+        Run several (name, args) calls concurrently; results in input order,
+        with exceptions (errors, timeouts) returned in place of results.
+        """
+        return await asyncio.gather(*(self.call(name, args) for name, args in calls), return_exceptions=True)
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self.run(self._cancel_inflight())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()